@@ -1,21 +1,33 @@
-from typing import Dict, Any, List
-from smartsql.registry import get_active_contract
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import time
+from typing import Dict, Any, List, Callable, Iterator, Optional
+from smartsql.registry import get_active_contract, get_active_version
 from smartsql.llm import get_llm
+from smartsql.sql_policy import lint_sql, contract_time_fields
+from smartsql.estimator import estimate_bytes
+from smartsql.rewriter import rewrite_sql
+from smartsql.singleflight import singleflight, canonical_key
 
 class AnalystAgent:
     name = "C"
 
+    def __init__(self, priority: str = "interactive"):
+        # LLM scheduler class: "interactive" (user-facing) or "batch"
+        self.priority = priority
+
     def handle(self, text: str) -> str:
         return "C(analyst): stub ok"
 
-    def draft_sql(self, nl_query: str, dataset: str = "prod") -> Dict[str, Any]:
-        contract = get_active_contract()
+    def _blocked(self, contract: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         if not contract:
             return {"status": "blocked", "message": "No active contract. Upload/activate a contract first."}
-
-        entities = (contract or {}).get("entities") or {}
-        if not entities:
+        if not (contract.get("entities") or {}):
             return {"status": "blocked", "message": "Active contract has no entities defined."}
+        return None
+
+    def _build_prompt(self, contract: Dict[str, Any], nl_query: str, dataset: str) -> str:
+        entities = contract.get("entities") or {}
 
         parts: List[str] = []
         time_field_candidates: List[str] = []
@@ -58,19 +70,153 @@ HARD RULES:
 - Output ONLY raw SQL. No explanations. No markdown or code fences.
 """.strip()
 
-        prompt = rules + "\n\nUser request:\n" + nl_query.strip()
-
-        llm = get_llm()
-        sql = llm.chat([{"role": "user", "content": prompt}]).strip()
+        return rules + "\n\nUser request:\n" + nl_query.strip()
 
+    @staticmethod
+    def _clean(sql: str) -> str:
+        sql = (sql or "").strip()
         if sql.startswith("```"):
             sql = sql.strip("`").replace("sql", "", 1).strip()
+        return sql
+
+    def _draft_result(self, contract: Dict[str, Any], dataset: str, sql: str) -> Dict[str, Any]:
         return {
             "status": "draft",
-            "message": "Draft SQL generated (offline mode; execution disabled).",
+            "message": "Draft SQL generated (not executed).",
             "contract_version": contract.get("version"),
             "dataset": dataset,
             "sql": sql,
-            "can_execute": False,
-            "reason": "offline mode (no BigQuery execution); dry-run not attempted."
+            "can_execute": True,
+            "reason": "confirm via /ask/execute: runs on local sample data when offline, BigQuery (after a dry run) when online."
+        }
+
+    @singleflight("analyst_draft", key=lambda a: canonical_key(
+        " ".join((a["nl_query"] or "").split()), a["dataset"], get_active_version(), a["self"].priority))
+    def draft_sql(self, nl_query: str, dataset: str = "prod") -> Dict[str, Any]:
+        contract = get_active_contract()
+        blocked = self._blocked(contract)
+        if blocked:
+            return blocked
+
+        prompt = self._build_prompt(contract, nl_query, dataset)
+        llm = get_llm(priority=self.priority)
+        sql = self._clean(llm.chat([{"role": "user", "content": prompt}]))
+        return self._draft_result(contract, dataset, sql)
+
+    def draft_sql_stream(self, nl_query: str, dataset: str = "prod") -> Iterator[Dict[str, Any]]:
+        """
+        Streaming draft_sql: yields {"type": "token", "text": ...} as SQL arrives,
+        then a single {"type": "draft", "draft": {...}} with the same shape as draft_sql.
+        """
+        contract = get_active_contract()
+        blocked = self._blocked(contract)
+        if blocked:
+            yield {"type": "draft", "draft": blocked}
+            return
+
+        prompt = self._build_prompt(contract, nl_query, dataset)
+        llm = get_llm(priority=self.priority)
+        chunks: List[str] = []
+        for text in llm.chat_stream([{"role": "user", "content": prompt}]):
+            chunks.append(text)
+            yield {"type": "token", "text": text}
+        yield {"type": "draft", "draft": self._draft_result(contract, dataset, self._clean("".join(chunks)))}
+
+    def draft_sql_speculative(
+        self,
+        nl_query: str,
+        dataset: str = "prod",
+        n: int = 3,
+        latency_budget_s: float = 8.0,
+        price: Optional[Callable[[str], int]] = None,
+        rewrite: bool = True,
+        prune_columns: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Generate `n` candidate SQLs in parallel (spread over temperatures), pass each
+        through the scan-reducing rewriter (unless rewrite=False), lint it against the
+        contract policy and price the clean ones with `price(sql) -> bytes` (defaults
+        to the Local Catalog estimator). Returns the cheapest clean candidate; its
+        "sql" is the raw draft, so the caller's rewrite step reproduces the same SQL
+        and reports the diff.
+        Stops early once the latency budget has elapsed and a clean candidate exists;
+        otherwise waits for all candidates and falls back to the first one drafted.
+        Candidates not yet started when we stop are skipped, but a provider call
+        already in flight (or already admitted by the LLM scheduler) runs to
+        completion in the background and its result is discarded.
+        """
+        contract = get_active_contract()
+        blocked = self._blocked(contract)
+        if blocked:
+            return blocked
+
+        prompt = self._build_prompt(contract, nl_query, dataset)
+        policy = contract.get("policy") or {}
+        require_time_window = bool(policy.get("require_time_window", True))
+        time_fields = contract_time_fields(contract, dataset)
+        price = price or (lambda q: estimate_bytes(q, dataset=dataset)["bytes_processed"])
+        llm = get_llm(priority=self.priority)
+        n = max(1, int(n))
+
+        cancelled = threading.Event()
+
+        def _candidate(i: int) -> Optional[Dict[str, Any]]:
+            if cancelled.is_set():
+                return None
+            temperature = 0.0 if n == 1 else round(0.9 * i / (n - 1), 2)
+            raw = self._clean(llm.chat([{"role": "user", "content": prompt}], temperature=temperature))
+            sql = rewrite_sql(raw, dataset=dataset, contract=contract, prune_columns=prune_columns)["sql"] if rewrite else raw
+            violations = lint_sql(sql, dataset=dataset, require_time_window=require_time_window, time_fields=time_fields)
+            ok = all(v.get("severity") != "error" for v in violations)
+            cand: Dict[str, Any] = {"index": i, "temperature": temperature, "raw_sql": raw, "sql": sql, "policy_ok": ok,
+                                    "violations": [v["code"] for v in violations], "bytes": None}
+            if ok and not cancelled.is_set():
+                try:
+                    b = price(sql)
+                    cand["bytes"] = None if b is None else int(b)
+                except Exception as e:
+                    cand["price_error"] = str(e)
+            return cand
+
+        started = time.monotonic()
+        deadline = started + latency_budget_s
+        done: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        pool = ThreadPoolExecutor(max_workers=n)
+        pending = {pool.submit(_candidate, i) for i in range(n)}
+        try:
+            while pending:
+                timeout = max(0.0, deadline - time.monotonic())
+                finished, pending = wait(pending, timeout=timeout if any(c["policy_ok"] for c in done) else None,
+                                         return_when=FIRST_COMPLETED)
+                for f in finished:
+                    try:
+                        cand = f.result()
+                        if cand is not None:
+                            done.append(cand)
+                    except Exception as e:
+                        errors.append(str(e))
+                if time.monotonic() >= deadline and any(c["policy_ok"] for c in done):
+                    break
+        finally:
+            cancelled.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if not done:
+            raise RuntimeError(f"All {n} candidate drafts failed: {errors}")
+        clean = [c for c in done if c["policy_ok"]]
+        if clean:
+            best = min(clean, key=lambda c: (c["bytes"] is None, c["bytes"] or 0, c["index"]))
+        else:
+            best = min(done, key=lambda c: c["index"])
+
+        out = self._draft_result(contract, dataset, best["raw_sql"])
+        out["speculative"] = {
+            "requested": n,
+            "completed": len(done),
+            "chosen": best["index"],
+            "elapsed_ms": int((time.monotonic() - started) * 1000),
+            "candidates": sorted(done, key=lambda c: c["index"]),
+            "errors": errors,
         }
+        return out
@@ -1,7 +1,8 @@
 from typing import Dict, Any, Optional, List, Tuple
-from smartsql.registry import get_active_contract
+from smartsql.registry import get_active_contract, get_active_version
 from smartsql.config import get_settings
 from smartsql.catalog import get_local_catalog
+from smartsql.singleflight import singleflight, canonical_key
 
 class VerifierAgent:
     name = "B"
@@ -35,6 +36,8 @@ class VerifierAgent:
             )
             return {"status": "blocked", "message": f"BigQuery access failed: {e}", "details": {"hint": hint, **info}}
 
+    @singleflight("verifier_compare", key=lambda a: canonical_key(
+        a["project"], a["dataset"], a["table"], get_active_version(), get_settings().offline))
     def compare_to_contract(self, project: Optional[str], dataset: str, table: str) -> Dict[str, Any]:
         """
         Compare active Contract vs a table schema.
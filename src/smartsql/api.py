@@ -1,20 +1,46 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator
+import json
+import threading
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Body
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from smartsql.config import get_settings
 from smartsql.agents.steward import StewardAgent
 from smartsql.agents.verifier import VerifierAgent
 from smartsql.agents.analyst import AnalystAgent
 from smartsql.registry import set_active_contract, get_active_contract, get_active_version
 from smartsql.catalog import set_local_catalog, get_local_catalog
-from smartsql.sql_policy import lint_sql
+from smartsql.sql_policy import lint_sql, contract_time_fields
 from smartsql.router import detect_intent
 from smartsql.settings import get_settings_store, set_settings_store
-from smartsql.graph import invoke_graph
+from smartsql.graph import invoke_graph, finish_draft
 from smartsql.bq_exec import dry_run as bq_dry_run, execute as bq_execute
+from smartsql.local_exec import execute as local_execute, has_sample_data
+from smartsql.estimator import estimate_bytes
+from smartsql.budget import check_budget, reserve_usage, settle_usage
+from smartsql.rewriter import rewrite_sql
+from smartsql.singleflight import singleflight_stats
+from smartsql.llm import get_scheduler
+from smartsql.warmup import warmup, HOOKS as WARMUP_HOOKS
 
 app = FastAPI(title="SmartSQL API", version="0.1.0")
 
+# ---- Warm-up (optional; heavy SDKs are otherwise imported on first use) ----
+@app.on_event("startup")
+def _startup_warmup():
+    # SMARTSQL_WARMUP=1 (all) or a comma list, e.g. "graph,llm"; runs in the
+    # background so the port opens immediately on scale-from-zero.
+    spec = get_settings().warmup  # via Settings so .env is loaded first
+    if spec in {"", "0", "false", "no", "off"}:
+        return
+    components = None if spec in {"1", "true", "yes", "on", "all"} else [c.strip() for c in spec.split(",") if c.strip()]
+    threading.Thread(target=warmup, args=(components,), daemon=True).start()
+
+@app.post("/warmup")
+def warmup_now(components: Optional[str] = Query(None)):
+    """Pre-warm ping: run warm-up hooks now (comma list, default all)."""
+    names = [c.strip() for c in components.split(",")] if components else list(WARMUP_HOOKS)
+    return {"ok": True, "warmup": warmup(names)}
+
 # ---- UI routes ----
 @app.get("/")
 def ui_index():
@@ -30,6 +56,12 @@ def health():
     s = get_settings()
     return {"status": "ok", "provider": s.provider, "offline": s.offline}
 
+# ---- Metrics ----
+@app.get("/metrics")
+def metrics():
+    """In-process counters (per worker): single-flight coalescing and the LLM scheduler."""
+    return {"ok": True, "singleflight": singleflight_stats(), "llm_scheduler": get_scheduler().stats()}
+
 # ---- Settings ----
 @app.get("/settings")
 def settings_get():
@@ -104,6 +136,22 @@ def catalog_get():
     cat = get_local_catalog()
     return {"ok": bool(cat), "catalog": cat}
 
+# ---- Scan pricing (shared by draft/rewrite) ----
+def _scan_bytes(sql: str, dataset: str) -> Dict[str, Any]:
+    """Dry-run bytes when online, Local Catalog estimate when offline."""
+    s = get_settings()
+    store = get_settings_store()
+    if s.offline or not store.get("data_project"):
+        est = estimate_bytes(sql, dataset=dataset)
+        if not est["complete"]:
+            # unpriced tables would read as 0 bytes; report them instead
+            return {"source": "catalog", "bytes_processed": None,
+                    "unpriced": est["unknown_tables"] + est["missing_stats"]}
+        return {"source": "catalog", "bytes_processed": est["bytes_processed"]}
+    est = bq_dry_run(sql=sql, data_project=store["data_project"], dataset=dataset,
+                     billing_project=store.get("billing_project") or store["data_project"], location=store.get("location"))
+    return {"source": "dry_run", "bytes_processed": est["bytes_processed"]}
+
 # ---- Ask (NL → SQL draft; offline-only for now) ----
 @app.post("/ask/draft")
 def ask_draft(payload: Dict[str, Any] = Body(...)):
@@ -112,37 +160,102 @@ def ask_draft(payload: Dict[str, Any] = Body(...)):
     if not nl_query or not isinstance(nl_query, str):
         raise HTTPException(status_code=400, detail="nl_query (string) is required.")
 
-    analyst = AnalystAgent()
-    draft = analyst.draft_sql(nl_query=nl_query, dataset=dataset)
+    priority = "batch" if (payload or {}).get("priority") == "batch" else "interactive"
+    analyst = AnalystAgent(priority=priority)
+    try:
+        candidates = int((payload or {}).get("candidates") or 1)
+        budget_ms = float((payload or {}).get("latency_budget_ms") or 8000)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="candidates (integer) and latency_budget_ms (number) must be numeric.")
+    if candidates < 1 or not budget_ms > 0:
+        raise HTTPException(status_code=400, detail="candidates must be >= 1 and latency_budget_ms > 0.")
+    if candidates > 1:
+        draft = analyst.draft_sql_speculative(nl_query=nl_query, dataset=dataset, n=min(candidates, 8),
+                                              latency_budget_s=budget_ms / 1000.0,
+                                              price=lambda q: _scan_bytes(q, dataset)["bytes_processed"],
+                                              rewrite=(payload or {}).get("rewrite", True),
+                                              prune_columns=bool((payload or {}).get("prune_columns")))
+    else:
+        draft = analyst.draft_sql(nl_query=nl_query, dataset=dataset)
+    return finish_draft(draft, dataset=dataset, rewrite=(payload or {}).get("rewrite", True),
+                         prune_columns=bool((payload or {}).get("prune_columns")))
 
-    active = get_active_contract() or {}
-    policy = (active.get("policy") or {})
-    require_time_window = bool(policy.get("require_time_window", True))
+# ---- Streaming (Server-Sent Events) ----
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-    time_fields: List[str] = []
-    for tbl, ent in (active.get("entities") or {}).items():
-        for fname, fmeta in (ent.get("fields") or {}).items():
-            t = (fmeta.get("type") or "").upper()
-            if t in {"TIMESTAMP", "DATETIME", "DATE"} or fname.lower() in {"ts","timestamp","event_ts","created_at","time"}:
-                time_fields.extend([f"{dataset}.{tbl}.{fname}", f"{tbl}.{fname}", fname])
+def _sse_response(events: Iterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    violations = lint_sql(draft.get("sql",""), dataset=dataset, require_time_window=require_time_window, time_fields=time_fields)
-    policy_ok = all(v.get("severity") != "error" for v in violations)
+def _stream_draft(nl_query: str, dataset: str, rewrite: bool, wrap=None,
+                  priority: str = "interactive", prune_columns: bool = False) -> Iterator[str]:
+    """token events while the LLM writes SQL, then one result event with policy_ok/violations."""
+    try:
+        for ev in AnalystAgent(priority=priority).draft_sql_stream(nl_query=nl_query, dataset=dataset):
+            if ev["type"] == "token":
+                yield _sse("token", {"text": ev["text"]})
+            else:
+                draft = finish_draft(ev["draft"], dataset=dataset, rewrite=rewrite, prune_columns=prune_columns)
+                yield _sse("result", wrap(draft) if wrap else draft)
+    except Exception as e:
+        yield _sse("error", {"status": "blocked", "message": f"draft failed: {e}"})
+
+@app.post("/ask/draft/stream")
+def ask_draft_stream(payload: Dict[str, Any] = Body(...)):
+    """
+    SSE variant of /ask/draft. Body as /ask/draft (rewrite, prune_columns, priority);
+    always a single candidate, so candidates/latency_budget_ms are ignored.
+    Events: `token` {"text"} per SQL chunk, then `result` (same body as /ask/draft) or `error`.
+    """
+    nl_query = (payload or {}).get("nl_query")
+    dataset = (payload or {}).get("dataset") or "prod"
+    if not nl_query or not isinstance(nl_query, str):
+        raise HTTPException(status_code=400, detail="nl_query (string) is required.")
+    priority = "batch" if (payload or {}).get("priority") == "batch" else "interactive"
+    return _sse_response(_stream_draft(nl_query, dataset, rewrite=(payload or {}).get("rewrite", True), priority=priority,
+                                       prune_columns=bool((payload or {}).get("prune_columns"))))
 
-    draft["policy_ok"] = policy_ok
-    draft["violations"] = violations
-    return draft
+# ---- Ask/Rewrite (deterministic scan-reducing rewrite; no LLM) ----
+@app.post("/ask/rewrite")
+def ask_rewrite(payload: Dict[str, Any] = Body(...)):
+    """
+    Body: { "sql": "...", "dataset": "prod", "prune_columns": false }
+    Adds a default time window on the partition column, enforces LIMIT and,
+    with prune_columns=true, narrows SELECT * to referenced columns. Returns rewritten SQL + diff and
+    before/after bytes (dry run online, catalog estimate offline).
+    """
+    sql = (payload or {}).get("sql") or ""
+    dataset = (payload or {}).get("dataset") or get_settings_store().get("dataset") or "prod"
+    if not sql.strip():
+        raise HTTPException(status_code=400, detail="sql is required.")
+    rw = rewrite_sql(sql, dataset=dataset, contract=get_active_contract() or {},
+                     prune_columns=bool((payload or {}).get("prune_columns")))
+    try:
+        before = _scan_bytes(rw["original_sql"], dataset)
+        after = _scan_bytes(rw["sql"], dataset) if rw["changed"] else before
+        rw["bytes"] = {"source": after["source"], "before": before["bytes_processed"], "after": after["bytes_processed"]}
+        if after.get("unpriced"):
+            rw["bytes"]["unpriced"] = after["unpriced"]
+    except Exception as e:
+        rw["bytes"] = {"error": f"estimate failed: {e}"}
+    return {"status": "rewrite", **rw}
 
-# ---- Ask/Execute (confirmation gate; offline blocks; online supports dry-run + execute) ----
+# ---- Ask/Execute (confirmation gate; offline runs on local samples; online supports dry-run + execute) ----
 @app.post("/ask/execute")
 def ask_execute(payload: Dict[str, Any] = Body(...)):
     """
-    Body: { "sql": "...", "dataset": "prod", "confirm": true|false }
+    Body: { "sql": "...", "dataset": "prod", "confirm": true|false, "user": "alice" (optional) }
     Behavior:
-      - Offline mode: always blocked (no cloud calls).
+      - Offline mode (no cloud calls):
+          * blocked unless sample data exists for every referenced table
+          * over-budget by the Local Catalog estimate -> policy_block
+          * if confirm=false or missing -> return status="estimate" (local engine)
+          * if confirm=true -> execute against local sample data (SQLite), return rows + schema
       - Online:
-          * if confirm=false or missing -> DRY RUN estimate, return status="estimate"
-          * if confirm=true -> execute with row cap, return rows + schema
+          * always DRY RUN first; over-budget (policy max_bytes_scanned / max_bytes_per_user_day) -> policy_block
+          * if confirm=false or missing -> return status="estimate"
+          * if confirm=true -> execute with row cap and maximum_bytes_billed, return rows + schema
     """
     s = get_settings()
     store = get_settings_store()
@@ -150,6 +263,7 @@ def ask_execute(payload: Dict[str, Any] = Body(...)):
     sql = (payload or {}).get("sql") or ""
     dataset = (payload or {}).get("dataset") or store.get("dataset") or "prod"
     confirm = bool((payload or {}).get("confirm"))
+    user = str((payload or {}).get("user") or "anonymous")
 
     if not sql.strip():
         raise HTTPException(status_code=400, detail="sql is required.")
@@ -158,22 +272,34 @@ def ask_execute(payload: Dict[str, Any] = Body(...)):
     active = get_active_contract() or {}
     policy = (active.get("policy") or {})
     require_time_window = bool(policy.get("require_time_window", True))
-    time_fields: List[str] = []
-    for tbl, ent in (active.get("entities") or {}).items():
-        for fname, fmeta in (ent.get("fields") or {}).items():
-            t = (fmeta.get("type") or "").upper()
-            if t in {"TIMESTAMP","DATETIME","DATE"} or fname.lower() in {"ts","timestamp","event_ts","created_at","time"}:
-                time_fields.extend([f"{dataset}.{tbl}.{fname}", f"{tbl}.{fname}", fname])
+    time_fields = contract_time_fields(active, dataset)
     violations = lint_sql(sql, dataset=dataset, require_time_window=require_time_window, time_fields=time_fields)
     if any(v.get("severity") == "error" for v in violations):
         return {"status":"policy_block","message":"SQL violates policy; fix and retry.","violations":violations}
 
     if s.offline:
-        return {
-            "status":"blocked",
-            "message":"Offline mode: execution disabled. Connect BigQuery and flip offline off.",
-            "details":{"dataset":dataset}
-        }
+        samples_dir = store.get("sample_data_dir")
+        if not has_sample_data(sql, samples_dir):
+            return {
+                "status":"blocked",
+                "message":"Offline mode: no local sample data for the referenced tables. Add .smartsql/samples/<table>.csv|json|parquet or connect BigQuery and flip offline off.",
+                "details":{"dataset":dataset}
+            }
+        est = estimate_bytes(sql, dataset=dataset)
+        est.update({"engine":"sqlite","billing_project":"offline","location":"local"})
+        # offline runs cost nothing and are not recorded, so only the per-query cap applies
+        budget_violations = check_budget(policy, est["bytes_processed"], user, include_quota=False)
+        if budget_violations:
+            return {"status":"policy_block","message":"Query exceeds scan budget (catalog estimate); narrow the time window or columns and retry.","violations":budget_violations,"estimate":est}
+        if not est["complete"] and policy.get("max_bytes_scanned") is not None:
+            est["warning"] = f"No catalog stats for {', '.join(est['unknown_tables'] + est['missing_stats'])}; max_bytes_scanned not verified."
+        if not confirm:
+            return {"status":"estimate","message":"Offline: will run against local sample data. Reply yes to execute.","estimate":est}
+        try:
+            res = local_execute(sql=sql, dataset=dataset, entities=active.get("entities") or {}, samples_dir=samples_dir, max_rows=200)
+            return {"status":"ok","message":"Query executed locally against sample data.","result":res}
+        except Exception as e:
+            return {"status":"blocked","message":f"Local execution failed: {e}"}
 
     # Online: need data project (tables) and optional billing project (jobs)
     data_project = store.get("data_project")
@@ -182,16 +308,31 @@ def ask_execute(payload: Dict[str, Any] = Body(...)):
     if not data_project:
         return {"status":"blocked","message":"Missing data_project in settings. Set it via /settings and retry."}
 
-    # Dry-run or execute
+    # Dry-run (always, for budget enforcement), then execute on confirm
     try:
+        est = bq_dry_run(sql=sql, data_project=data_project, dataset=dataset, billing_project=billing_project, location=location)
+        budget_violations = check_budget(policy, est["bytes_processed"], user)
+        if budget_violations:
+            return {"status":"policy_block","message":"Query exceeds scan budget; narrow the time window or columns and retry.","violations":budget_violations,"estimate":est}
         if not confirm:
-            est = bq_dry_run(sql=sql, data_project=data_project, dataset=dataset, billing_project=billing_project, location=location)
             return {"status":"estimate","message":"Dry-run cost estimate. Reply yes to execute.","estimate":est}
-        # Confirmed -> execute
-        res = bq_execute(sql=sql, data_project=data_project, dataset=dataset, billing_project=billing_project, location=location, max_rows=200)
+    except Exception as e:
+        return {"status":"blocked","message":f"BigQuery job failed: {e}"}
+
+    # Confirmed -> reserve the estimate against the daily quota atomically, execute, then settle to actual bytes
+    reservation, quota_violations = reserve_usage(policy, est["bytes_processed"], user)
+    if quota_violations:
+        return {"status":"policy_block","message":"Query exceeds scan budget; narrow the time window or columns and retry.","violations":quota_violations,"estimate":est}
+    actual = 0
+    try:
+        res = bq_execute(sql=sql, data_project=data_project, dataset=dataset, billing_project=billing_project, location=location, max_rows=200,
+                         max_bytes_billed=policy.get("max_bytes_scanned"))
+        actual = res.get("bytes_processed", 0)
         return {"status":"ok","message":"Query executed.","result":res}
     except Exception as e:
         return {"status":"blocked","message":f"BigQuery job failed: {e}"}
+    finally:
+        settle_usage(reservation, actual)
 
 # ---- Chat (router via LangGraph orchestrator) ----
 @app.post("/chat")
@@ -207,7 +348,31 @@ def chat_router(payload: Dict[str, Any] = Body(...)):
     res = out.get("result")
     if res:
         return {"ok": True, "intent": out.get("intent"), "result": res}
-    intent = out.get("intent","unknown")
+    return _chat_fallback(out.get("intent","unknown"))
+
+def _chat_fallback(intent: str) -> Dict[str, Any]:
     if intent == "verify_tables":
         return {"ok": False, "intent": intent, "message": "Please provide dataset and table, e.g., 'verify prod spans'."}
     return {"ok": False, "intent": intent, "message": "I didn't fully understand. Try 'verify <dataset> <table>' or ask a KPI question."}
+
+@app.post("/chat/stream")
+def chat_router_stream(payload: Dict[str, Any] = Body(...)):
+    """
+    SSE variant of /chat. KPI questions stream SQL `token` events, then a `result`
+    event with the /chat body; other intents send a single `result` event.
+    """
+    text = (payload or {}).get("text") or ""
+    dataset = (payload or {}).get("dataset") or "prod"
+    table = (payload or {}).get("table")
+    intent = detect_intent(text).intent
+
+    def events() -> Iterator[str]:
+        if intent == "kpi_query":
+            yield from _stream_draft(text, dataset, rewrite=True,
+                                     wrap=lambda d: {"ok": True, "intent": intent, "result": d})
+            return
+        out = invoke_graph(text=text, dataset=dataset, table=table)
+        res = out.get("result")
+        yield _sse("result", {"ok": True, "intent": out.get("intent"), "result": res} if res else _chat_fallback(out.get("intent","unknown")))
+
+    return _sse_response(events())
@@ -1,10 +1,13 @@
 from __future__ import annotations
 from typing import Dict, Any, Optional
 import re
+from smartsql.singleflight import singleflight, canonical_key, normalize_sql
 
 def _has_limit(sql: str) -> bool:
     return bool(re.search(r"\bLIMIT\s+\d+\b", sql, re.I))
 
+@singleflight("bq_dry_run", key=lambda a: canonical_key(
+    normalize_sql(a["sql"]), a["data_project"], a["dataset"], a["billing_project"], a["location"]))
 def dry_run(sql: str, data_project: str, dataset: str, billing_project: Optional[str], location: Optional[str]) -> Dict[str, Any]:
     from google.cloud import bigquery
     client = bigquery.Client(project=billing_project or data_project, location=location)
@@ -24,13 +27,16 @@ def dry_run(sql: str, data_project: str, dataset: str, billing_project: Optional
         "has_limit": _has_limit(sql),
     }
 
-def execute(sql: str, data_project: str, dataset: str, billing_project: Optional[str], location: Optional[str], max_rows: int = 200) -> Dict[str, Any]:
+def execute(sql: str, data_project: str, dataset: str, billing_project: Optional[str], location: Optional[str], max_rows: int = 200, max_bytes_billed: Optional[int] = None) -> Dict[str, Any]:
     from google.cloud import bigquery
     client = bigquery.Client(project=billing_project or data_project, location=location)
     job_config = bigquery.QueryJobConfig(
         default_dataset=f"{data_project}.{dataset}",
         use_query_cache=True,
     )
+    if max_bytes_billed:
+        # hard backstop: BigQuery fails the job instead of billing past the cap
+        job_config.maximum_bytes_billed = int(max_bytes_billed)
     job = client.query(sql, job_config=job_config)
     result = job.result(max_results=max_rows)
     schema = [{"name": f.name, "type": f.field_type, "mode": f.mode} for f in result.schema]
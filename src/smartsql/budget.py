@@ -0,0 +1,84 @@
+from __future__ import annotations
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from smartsql.state import get_json, update_json
+
+_LEGACY_FILE = Path(".smartsql") / "usage.json"
+
+def get_usage(user: str, day: Optional[str] = None) -> int:
+    """Bytes scanned by `user` on `day` (ISO date; defaults to today)."""
+    day = day or date.today().isoformat()
+    return int(((get_json("usage", default={}, legacy_file=_LEGACY_FILE).get(day) or {}).get(user)) or 0)
+
+def _keep(usage: Dict[str, Any], day: str) -> Dict[str, Any]:
+    """Days still worth keeping: today (and later) plus `day` itself, e.g. a reservation settled after midnight."""
+    today = date.today().isoformat()
+    return {d: dict(v or {}) for d, v in (usage or {}).items() if d >= today or d == day}
+
+def record_usage(user: str, bytes_scanned: int, day: Optional[str] = None) -> int:
+    """Add `bytes_scanned` (may be negative) to `user`'s total for `day` (default today); returns the new total. Days before today (other than `day`) are dropped."""
+    day = day or date.today().isoformat()
+
+    def _add(usage: Dict[str, Any]) -> Dict[str, Any]:
+        kept = _keep(usage, day)
+        totals = kept.setdefault(day, {})
+        totals[user] = max(0, int(totals.get(user) or 0) + int(bytes_scanned or 0))
+        return kept
+    get_json("usage", legacy_file=_LEGACY_FILE)  # migrate an old usage.json first
+    return update_json("usage", _add, default={})[day][user]
+
+def reserve_usage(policy: Dict[str, Any], estimated_bytes: int, user: str) -> Tuple[Optional[Dict[str, Any]], List[Dict]]:
+    """
+    Atomically check the daily quota and reserve `estimated_bytes` for `user`, so
+    concurrent queries cannot all pass the check and jointly overrun it.
+    Returns (reservation, violations); settle the reservation with settle_usage().
+    """
+    day = date.today().isoformat()
+    quota = policy.get("max_bytes_per_user_day")
+    if quota is None:
+        return {"user": user, "day": day, "bytes": 0}, []
+    used_before: List[int] = []
+
+    def _reserve(usage: Dict[str, Any]) -> Dict[str, Any]:
+        kept = _keep(usage, day)
+        totals = kept.setdefault(day, {})
+        used = int(totals.get(user) or 0)
+        used_before.append(used)
+        if used + int(estimated_bytes) <= int(quota):
+            totals[user] = used + int(estimated_bytes)
+        return kept
+    get_json("usage", legacy_file=_LEGACY_FILE)  # migrate an old usage.json first
+    update_json("usage", _reserve, default={})
+    used = used_before[-1]
+    if used + int(estimated_bytes) > int(quota):
+        return None, [_quota_violation(user, used, int(quota), estimated_bytes)]
+    return {"user": user, "day": day, "bytes": int(estimated_bytes)}, []
+
+def settle_usage(reservation: Dict[str, Any], actual_bytes: int) -> int:
+    """Replace a reservation with the bytes actually scanned (0 if the job failed)."""
+    return record_usage(reservation["user"], int(actual_bytes or 0) - int(reservation["bytes"]), day=reservation["day"])
+
+def _quota_violation(user: str, used: int, quota: int, estimated_bytes: int) -> Dict:
+    return {"code":"DAILY_QUOTA_EXCEEDED", "severity":"error",
+            "message":f"User '{user}' has used {used} of {quota} bytes today; this query needs ~{estimated_bytes} more."}
+
+def check_budget(policy: Dict[str, Any], estimated_bytes: int, user: str, include_quota: bool = True) -> List[Dict]:
+    """
+    Returns budget violations ({code, severity, message}) for a query estimated at `estimated_bytes`.
+    Contract policy fields (both optional):
+      - max_bytes_scanned: per-query cap
+      - max_bytes_per_user_day: per-user daily quota (a read-only preview; use
+        reserve_usage() before actually running a job)
+    """
+    violations: List[Dict] = []
+    cap = policy.get("max_bytes_scanned")
+    if cap is not None and estimated_bytes > int(cap):
+        violations.append({"code":"BYTES_BUDGET_EXCEEDED", "severity":"error",
+                           "message":f"Estimated scan {estimated_bytes} bytes exceeds max_bytes_scanned={int(cap)}."})
+    quota = policy.get("max_bytes_per_user_day")
+    if quota is not None and include_quota:
+        used = get_usage(user)
+        if used + estimated_bytes > int(quota):
+            violations.append(_quota_violation(user, used, int(quota), estimated_bytes))
+    return violations
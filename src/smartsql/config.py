@@ -1,8 +1,10 @@
 from functools import lru_cache
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+def _to_float(v, default=None):
+    if v is None or str(v).strip() == "":
+        return default
+    return float(v)
 
 def _to_bool(v, default=False):
     if v is None:
@@ -15,7 +17,19 @@ class Settings:
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
         # offline by default; only touch cloud when explicitly configured
         self.offline = _to_bool(os.getenv("SMARTSQL_OFFLINE"), True)
+        # startup warm-up: "1"/"all" or a comma list of hooks (see warmup.HOOKS)
+        self.warmup = (os.getenv("SMARTSQL_WARMUP") or "").strip().lower()
+        # LLM scheduler (see llm.LLMScheduler)
+        self.llm_rate_per_s = _to_float(os.getenv("SMARTSQL_LLM_RPS"), 5.0)
+        self.llm_burst = _to_float(os.getenv("SMARTSQL_LLM_BURST"), 10.0)
+        self.llm_max_concurrency = int(_to_float(os.getenv("SMARTSQL_LLM_MAX_CONCURRENCY"), 16))
+        self.llm_target_latency_s = _to_float(os.getenv("SMARTSQL_LLM_TARGET_LATENCY_S"), 8.0)
+        self.llm_deadline_s = _to_float(os.getenv("SMARTSQL_LLM_DEADLINE_S"), 30.0)
+        self.llm_batch_deadline_s = _to_float(os.getenv("SMARTSQL_LLM_BATCH_DEADLINE_S"), None)
 
 @lru_cache
 def get_settings() -> Settings:
+    # .env is loaded on first use rather than at import (keeps cold start lean)
+    from dotenv import load_dotenv
+    load_dotenv()
     return Settings()
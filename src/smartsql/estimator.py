@@ -0,0 +1,117 @@
+from __future__ import annotations
+from datetime import date, datetime
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from smartsql.catalog import get_local_catalog
+from smartsql.sql_policy import strip_sql_comments
+
+# Offline bytes-scanned estimate from Local Catalog column statistics.
+# Catalog table entries may carry (all optional):
+#   {"row_count": 1000000,
+#    "partition": {"field": "ts", "type": "DAY", "count": 365},
+#    "fields": {"cost_usd": {"type": "NUMERIC", "bytes": 16000000}, "agent_name": {"type": "STRING", "avg_bytes": 24}}}
+# Column size precedence: fields[f].bytes (total) > avg_bytes * row_count > type default * row_count.
+# Tables without row_count (e.g. catalogs written by the verifier) can't be priced unless every
+# needed column carries a total "bytes"; they are listed under "missing_stats", not counted as 0.
+
+# BigQuery logical data sizes (bytes per value); STRING/BYTES use a rough average.
+_TYPE_BYTES = {
+    "INT64": 8, "INTEGER": 8, "FLOAT64": 8, "FLOAT": 8, "NUMERIC": 16, "BIGNUMERIC": 32,
+    "BOOL": 1, "BOOLEAN": 1, "TIMESTAMP": 8, "DATETIME": 8, "DATE": 8, "TIME": 8,
+    "STRING": 32, "BYTES": 32, "GEOGRAPHY": 64, "JSON": 64,
+}
+_DEFAULT_BYTES = 32
+
+_TABLE_REF = re.compile(r"`([^`]+)`")
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_SELECT_STAR = re.compile(r"\bSELECT\s+(DISTINCT\s+)?(\w+\.)?\*", re.I)
+_INTERVAL = re.compile(r"\bINTERVAL\s+(\d+)\s+(HOUR|DAY|WEEK|MONTH|YEAR)\b", re.I)
+_DATE_LITERAL = re.compile(r"'(\d{4}-\d{2}-\d{2})")
+
+_UNIT_DAYS = {"HOUR": 1 / 24, "DAY": 1, "WEEK": 7, "MONTH": 30, "YEAR": 365}
+_PARTITION_DAYS = {"HOUR": 1 / 24, "DAY": 1, "MONTH": 30, "YEAR": 365}
+
+def _column_bytes(fmeta: Dict[str, Any], row_count: int) -> int:
+    if fmeta.get("bytes") is not None:
+        return int(fmeta["bytes"])
+    per_row = fmeta.get("avg_bytes")
+    if per_row is None:
+        per_row = _TYPE_BYTES.get((fmeta.get("type") or "").upper(), _DEFAULT_BYTES)
+    return int(per_row * row_count)
+
+def _window_days(sql: str, field: str) -> Optional[float]:
+    """Days covered by a time-window filter on `field`, or None if no filter is found."""
+    m = re.search(rf"\b{re.escape(field)}\b\s*(>=|>|BETWEEN)([^;]*)", sql, re.I)
+    if not m:
+        return None
+    # only look at the predicate, not the rest of the query
+    tail = re.split(r"\b(?:AND\s+\w+\s*(?:=|<|>|!)|(?:GROUP|ORDER|LIMIT|HAVING)\b)", m.group(2), maxsplit=1, flags=re.I)[0]
+    iv = _INTERVAL.search(tail)
+    if iv:
+        return int(iv.group(1)) * _UNIT_DAYS[iv.group(2).upper()]
+    dates = _DATE_LITERAL.findall(tail)
+    if dates:
+        start = datetime.strptime(dates[0], "%Y-%m-%d").date()
+        end = datetime.strptime(dates[1], "%Y-%m-%d").date() if len(dates) > 1 else date.today()
+        return max((end - start).days + 1, 1)
+    return None
+
+def _partition_fraction(sql: str, partition: Dict[str, Any]) -> float:
+    field = partition.get("field")
+    count = partition.get("count")
+    if not field or not count:
+        return 1.0
+    days = _window_days(sql, field)
+    if days is None:
+        return 1.0
+    per_partition = _PARTITION_DAYS.get((partition.get("type") or "DAY").upper(), 1)
+    return min(1.0, math.ceil(days / per_partition) / float(count))
+
+def estimate_bytes(sql: str, dataset: str, catalog: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Price the scan for `sql` using Local Catalog stats (no cloud calls).
+    Returns the same core keys as bq_exec.dry_run plus a per-table breakdown.
+    bytes_processed covers priced tables only; "complete" is False when any
+    referenced table is unknown to the catalog or lacks stats.
+    """
+    cat = catalog if catalog is not None else (get_local_catalog() or {})
+    ds_map = ((cat.get("datasets") or {}).get(dataset) or {})
+    s = strip_sql_comments(sql)
+    idents = {t.lower() for t in _IDENT.findall(_TABLE_REF.sub(" ", s))}
+    select_star = bool(_SELECT_STAR.search(s))
+
+    tables: Dict[str, Any] = {}
+    unknown: List[str] = []
+    missing: List[str] = []
+    total = 0
+    for ref in dict.fromkeys(_TABLE_REF.findall(s)):
+        name = ref.split(".")[-1]
+        tentry = ds_map.get(name)
+        if tentry is None:
+            unknown.append(ref)
+            continue
+        fields: Dict[str, Dict[str, Any]] = tentry.get("fields") or {}
+        row_count = int(tentry.get("row_count") or 0)
+        cols = list(fields.keys()) if select_star else [f for f in fields if f.lower() in idents]
+        if tentry.get("row_count") is None and any(fields[c].get("bytes") is None for c in cols):
+            missing.append(ref)
+            continue
+        full = sum(_column_bytes(fields[c], row_count) for c in cols)
+        frac = _partition_fraction(s, tentry.get("partition") or {})
+        scanned = int(full * frac)
+        total += scanned
+        tables[name] = {"columns": cols, "row_count": row_count, "partition_fraction": round(frac, 6), "bytes": scanned}
+
+    return {
+        "status": "estimate",
+        "source": "catalog",
+        "bytes_processed": total,
+        "dataset": dataset,
+        "has_limit": bool(re.search(r"\bLIMIT\s+\d+\b", s, re.I)),
+        "tables": tables,
+        "unknown_tables": unknown,
+        "missing_stats": missing,
+        "complete": not unknown and not missing,
+    }
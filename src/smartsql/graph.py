@@ -1,10 +1,12 @@
-from typing import TypedDict, Optional, Dict, Any, List
-from langgraph.graph import StateGraph, END
+from functools import lru_cache
+from typing import TypedDict, Optional, Dict, Any
 from smartsql.router import detect_intent
 from smartsql.agents.verifier import VerifierAgent
 from smartsql.agents.analyst import AnalystAgent
 from smartsql.registry import get_active_contract
-from smartsql.sql_policy import lint_sql
+from smartsql.sql_policy import lint_sql, contract_time_fields
+from smartsql.estimator import estimate_bytes
+from smartsql.rewriter import rewrite_sql
 
 class SmartState(TypedDict, total=False):
     text: str
@@ -29,27 +31,31 @@ def verify_node(state: SmartState) -> SmartState:
     state["result"] = v.compare_to_contract(project=None, dataset=dataset, table=table)
     return state
 
-def ask_node(state: SmartState) -> SmartState:
-    dataset = state.get("dataset") or "prod"
-    text = state.get("text","")
-    a = AnalystAgent()
-    draft = a.draft_sql(nl_query=text, dataset=dataset)
-
-    # Lint policy (same logic as API)
+def finish_draft(draft: Dict[str, Any], dataset: str, rewrite: bool = True, prune_columns: bool = False) -> Dict[str, Any]:
+    """Post-draft pipeline shared by /ask/draft, the streaming endpoints and the graph: rewrite, lint, price."""
     active = get_active_contract() or {}
+    if draft.get("sql") and rewrite:
+        rw = rewrite_sql(draft["sql"], dataset=dataset, contract=active, prune_columns=prune_columns)
+        draft["sql"] = rw["sql"]
+        draft["rewrite"] = {k: rw[k] for k in ("changed", "changes", "suggestions", "skipped", "diff", "original_sql")}
     policy = (active.get("policy") or {})
     require_time_window = bool(policy.get("require_time_window", True))
-    time_fields: List[str] = []
-    for tbl, ent in (active.get("entities") or {}).items():
-        for fname, fmeta in (ent.get("fields") or {}).items():
-            t = (fmeta.get("type") or "").upper()
-            if t in {"TIMESTAMP","DATETIME","DATE"} or fname.lower() in {"ts","timestamp","event_ts","created_at","time"}:
-                time_fields.extend([f"{dataset}.{tbl}.{fname}", f"{tbl}.{fname}", fname])
+    time_fields = contract_time_fields(active, dataset)
     violations = lint_sql(draft.get("sql",""), dataset=dataset, require_time_window=require_time_window, time_fields=time_fields)
+
     draft["policy_ok"] = all(v.get("severity") != "error" for v in violations)
     draft["violations"] = violations
+    draft["can_execute"] = bool(draft.get("sql")) and draft["policy_ok"]
+    if draft.get("sql"):
+        draft["estimate"] = estimate_bytes(draft["sql"], dataset=dataset)
+    return draft
 
-    state["result"] = draft
+def ask_node(state: SmartState) -> SmartState:
+    dataset = state.get("dataset") or "prod"
+    text = state.get("text","")
+    a = AnalystAgent()
+    draft = a.draft_sql(nl_query=text, dataset=dataset)
+    state["result"] = finish_draft(draft, dataset=dataset)
     return state
 
 def _branch(state: SmartState) -> str:
@@ -61,6 +67,8 @@ def _branch(state: SmartState) -> str:
     return "end"
 
 def build_graph():
+    # langgraph is heavy to import; defer it until the graph is first needed
+    from langgraph.graph import StateGraph, END
     g = StateGraph(SmartState)
     g.add_node("route", route_node)
     g.add_node("verify", verify_node)
@@ -76,6 +84,11 @@ def build_graph():
     g.add_edge("ask", END)
     return g.compile()
 
+@lru_cache(maxsize=1)
+def get_graph():
+    """Compiled graph, built once per process."""
+    return build_graph()
+
 def invoke_graph(text: str, dataset: str = "prod", table: Optional[str] = None) -> SmartState:
-    app = build_graph()
+    app = get_graph()
     return app.invoke({"text": text, "dataset": dataset, "table": table})
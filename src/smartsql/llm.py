@@ -1,10 +1,262 @@
-from typing import List, Dict, Any
+from __future__ import annotations
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import List, Dict, Any, Callable, Iterator, Optional
 from .config import get_settings
 
+# ---- Scheduler: rate limit + adaptive concurrency + priorities ----
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+class LLMDeadlineExceeded(RuntimeError):
+    pass
+
+def _is_rate_limited(e: BaseException) -> bool:
+    code = getattr(e, "code", None)
+    code = getattr(code, "value", code)  # grpc StatusCode enums
+    text = f"{type(e).__name__} {e}".lower()
+    return code == 429 or "429" in text or "resourceexhausted" in text or "rate limit" in text or "quota" in text
+
+def _is_transient(e: BaseException) -> bool:
+    text = f"{type(e).__name__} {e}".lower()
+    return _is_rate_limited(e) or any(k in text for k in ("503", "unavailable", "deadlineexceeded", "timeout", "internal"))
+
+class TokenBucket:
+    """
+    Requests-per-second limiter; `rate` tokens/s refill up to `burst`.
+    rate <= 0 disables the limit; burst is clamped to >= 1 (a bucket that can
+    never hold a whole token would block every call).
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._clock = clock
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise LLMDeadlineExceeded("LLM rate limit: deadline reached while waiting for a token.")
+            time.sleep(wait)
+
+class LLMScheduler:
+    """
+    Gates provider calls:
+      - token bucket (requests/s)
+      - AIMD concurrency limit: +1/limit per fast success, x0.9 when slower than
+        target_latency_s, x0.5 on rate-limit/error; at most one decrease per
+        target_latency_s window, so a burst of concurrent 429s halves it once
+      - priority queue: interactive waiters are admitted before batch
+      - a stream abandoned by its consumer (client disconnect) releases its
+        slot without touching the limit
+      - retries on 429/transient errors with full-jitter exponential backoff,
+        never sleeping past the caller's deadline
+    `fn` receives the seconds left before the deadline (None if unbounded) to
+    use as the provider request timeout; no attempt starts once it has passed.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float = 5.0,
+        burst: float = 10.0,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        initial_concurrency: int = 4,
+        target_latency_s: float = 8.0,
+        max_retries: int = 4,
+        base_backoff_s: float = 0.5,
+        max_backoff_s: float = 8.0,
+    ):
+        self.bucket = TokenBucket(rate_per_s, burst)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency_s = target_latency_s
+        self.max_retries = max_retries
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self._last_decrease = float("-inf")
+        self._in_flight = 0
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {"calls": 0, "ok": 0, "rate_limited": 0, "errors": 0, "retries": 0, "deadline_exceeded": 0, "cancelled": 0}
+
+    # -- slots --
+    def _acquire_slot(self, priority: str, deadline: Optional[float]) -> None:
+        entry = (PRIORITIES.get(priority, PRIORITIES["batch"]), next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            while not (self._waiters[0] == entry and self._in_flight < int(self._limit)):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                    raise LLMDeadlineExceeded("LLM scheduler: deadline reached while queued.")
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            self._cond.notify_all()
+
+    def _release_slot(self, latency_s: float, outcome: str) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if outcome == "cancelled":
+                pass
+            elif outcome == "ok" and latency_s <= self.target_latency_s:
+                self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+            elif now - self._last_decrease >= self.target_latency_s:
+                factor = 0.9 if outcome == "ok" else 0.5
+                self._limit = max(self.min_concurrency, self._limit * factor)
+                self._last_decrease = now
+            self._stats[outcome if outcome in ("ok", "rate_limited", "cancelled") else "errors"] += 1
+            self._cond.notify_all()
+
+    def _backoff_or_raise(self, e: Exception, attempt: int, deadline: Optional[float]) -> None:
+        if not _is_transient(e) or attempt >= self.max_retries:
+            raise e
+        delay = random.uniform(0, min(self.max_backoff_s, self.base_backoff_s * (2 ** attempt)))
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            with self._cond:
+                self._stats["deadline_exceeded"] += 1
+            raise LLMDeadlineExceeded(f"LLM retry budget exhausted before deadline: {e}") from e
+        with self._cond:
+            self._stats["retries"] += 1
+        time.sleep(delay)
+
+    def _admit(self, priority: str, deadline: Optional[float]) -> Optional[float]:
+        """Wait for a slot and a token; returns the seconds left for the provider call."""
+        try:
+            self._acquire_slot(priority, deadline)
+        except LLMDeadlineExceeded:
+            with self._cond:
+                self._stats["deadline_exceeded"] += 1
+            raise
+        try:
+            self.bucket.acquire(deadline)
+        except LLMDeadlineExceeded:
+            with self._cond:
+                self._in_flight -= 1
+                self._stats["deadline_exceeded"] += 1
+                self._cond.notify_all()
+            raise
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            with self._cond:
+                self._in_flight -= 1
+                self._stats["deadline_exceeded"] += 1
+                self._cond.notify_all()
+            raise LLMDeadlineExceeded("LLM scheduler: deadline reached before the call could start.")
+        return remaining
+
+    # -- public --
+    def call(self, fn: Callable[[Optional[float]], Any], priority: str = "interactive", deadline_s: Optional[float] = None) -> Any:
+        deadline = None if deadline_s is None else time.monotonic() + deadline_s
+        with self._cond:
+            self._stats["calls"] += 1
+        attempt = 0
+        while True:
+            timeout = self._admit(priority, deadline)
+            t0 = time.monotonic()
+            try:
+                result = fn(timeout)
+            except Exception as e:
+                self._release_slot(time.monotonic() - t0, "rate_limited" if _is_rate_limited(e) else "error")
+                self._backoff_or_raise(e, attempt, deadline)
+                attempt += 1
+                continue
+            self._release_slot(time.monotonic() - t0, "ok")
+            return result
+
+    def stream(self, fn: Callable[[Optional[float]], Iterator[Any]], priority: str = "interactive", deadline_s: Optional[float] = None) -> Iterator[Any]:
+        """Like call() for streaming responses; retries only until the first chunk arrives."""
+        deadline = None if deadline_s is None else time.monotonic() + deadline_s
+        with self._cond:
+            self._stats["calls"] += 1
+        attempt = 0
+        while True:
+            timeout = self._admit(priority, deadline)
+            t0 = time.monotonic()
+            try:
+                it = iter(fn(timeout))
+                first = next(it, None)
+            except Exception as e:
+                self._release_slot(time.monotonic() - t0, "rate_limited" if _is_rate_limited(e) else "error")
+                self._backoff_or_raise(e, attempt, deadline)
+                attempt += 1
+                continue
+            break
+        latency, outcome = time.monotonic() - t0, "error"
+        try:
+            if first is not None:
+                yield first
+            yield from it
+            outcome = "ok"
+        except GeneratorExit:
+            outcome = "cancelled"  # consumer went away; says nothing about provider health
+            raise
+        finally:
+            self._release_slot(latency, outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+            }
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            s = get_settings()
+            _scheduler = LLMScheduler(
+                rate_per_s=s.llm_rate_per_s,
+                burst=s.llm_burst,
+                max_concurrency=s.llm_max_concurrency,
+                target_latency_s=s.llm_target_latency_s,
+            )
+        return _scheduler
+
+# ---- Client ----
+
 class LLM:
-    def __init__(self):
+    def __init__(self, priority: str = "interactive"):
         self.settings = get_settings()
-        if self.settings.provider.lower() != "gemini":
+        self.priority = priority
+        self.scheduler = get_scheduler()
+        provider = self.settings.provider.lower()
+        if provider == "fake":
+            # local fake provider (latency + injected 429s) for scheduler testing
+            from smartsql.llm_fake import FakeModel
+            self.model = FakeModel.from_env()
+            return
+        if provider != "gemini":
             raise NotImplementedError(f"Provider {self.settings.provider} not supported yet.")
         if not self.settings.google_api_key:
             raise RuntimeError("GOOGLE_API_KEY missing. Add it to .env and re-run.")
@@ -16,17 +268,55 @@ class LLM:
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Gemini client: {e}") from e
 
-    def chat(self, messages: List[Dict[str, Any]]) -> str:
+    @staticmethod
+    def _prepare(messages: List[Dict[str, Any]], temperature: Optional[float]) -> tuple:
+        prompt = "\n".join(m.get("content","") for m in messages if m.get("content"))
+        kwargs: Dict[str, Any] = {}
+        if temperature is not None:
+            kwargs["generation_config"] = {"temperature": temperature}
+        return prompt, kwargs
+
+    @staticmethod
+    def _timeout(timeout: Optional[float]) -> Dict[str, Any]:
+        return {"request_options": {"timeout": timeout}} if timeout is not None else {}
+
+    def _deadline(self) -> Optional[float]:
+        if self.priority == "batch":
+            return self.settings.llm_batch_deadline_s
+        return self.settings.llm_deadline_s
+
+    def chat(self, messages: List[Dict[str, Any]], temperature: Optional[float] = None) -> str:
         """
         messages: list of {"role": "user"|"system"|"assistant", "content": str}
+        temperature: optional sampling temperature (provider default if None).
         Returns plain text response.
         """
-        prompt = "\n".join(m.get("content","") for m in messages if m.get("content"))
+        prompt, kwargs = self._prepare(messages, temperature)
         try:
-            resp = self.model.generate_content(prompt)
+            resp = self.scheduler.call(lambda t: self.model.generate_content(prompt, **kwargs, **self._timeout(t)),
+                                       priority=self.priority, deadline_s=self._deadline())
             return (resp.text or "").strip()
         except Exception as e:
             raise RuntimeError(f"LLM call failed: {e}") from e
 
-def get_llm() -> LLM:
-    return LLM()
+    def chat_stream(self, messages: List[Dict[str, Any]], temperature: Optional[float] = None) -> Iterator[str]:
+        """
+        Same as chat(), but yields text chunks as the provider produces them.
+        """
+        prompt, kwargs = self._prepare(messages, temperature)
+        try:
+            chunks = self.scheduler.stream(lambda t: self.model.generate_content(prompt, stream=True, **kwargs, **self._timeout(t)),
+                                           priority=self.priority, deadline_s=self._deadline())
+            for chunk in chunks:
+                try:
+                    text = chunk.text or ""
+                except (AttributeError, ValueError):
+                    # Gemini raises ValueError on .text for blocked/empty chunks (no parts)
+                    continue
+                if text:
+                    yield text
+        except Exception as e:
+            raise RuntimeError(f"LLM call failed: {e}") from e
+
+def get_llm(priority: str = "interactive") -> LLM:
+    return LLM(priority=priority)
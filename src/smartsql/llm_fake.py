@@ -0,0 +1,95 @@
+from __future__ import annotations
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+# Local stand-in for a GenerativeModel (PROVIDER=fake). Injects latency and
+# 429s so the LLM scheduler can be exercised without a network or API key.
+
+class FakeRateLimitError(Exception):
+    code = 429
+
+class _Resp:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeModel:
+    """
+    latency_s/jitter_s: per-call delay; error_rate: chance of a 429;
+    capacity: concurrent calls above this get a 429 (simulated provider overload)
+    and add latency_s per extra in-flight call.
+    """
+
+    def __init__(self, latency_s: float = 0.2, jitter_s: float = 0.1, error_rate: float = 0.0,
+                 capacity: Optional[int] = None, response: str = "SELECT 1 LIMIT 1", chunk_size: int = 8,
+                 seed: Optional[int] = None):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.response = response
+        self.chunk_size = chunk_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeModel":
+        cap = os.getenv("SMARTSQL_FAKE_CAPACITY")
+        return cls(
+            latency_s=float(os.getenv("SMARTSQL_FAKE_LATENCY_S", "0.2")),
+            jitter_s=float(os.getenv("SMARTSQL_FAKE_JITTER_S", "0.1")),
+            error_rate=float(os.getenv("SMARTSQL_FAKE_429_RATE", "0")),
+            capacity=int(cap) if cap else None,
+            response=os.getenv("SMARTSQL_FAKE_RESPONSE", "SELECT 1 LIMIT 1"),
+        )
+
+    def _enter(self) -> float:
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            over = 0 if self.capacity is None else self._in_flight - self.capacity
+            reject = over > 0 or self._rng.random() < self.error_rate
+            if reject:
+                self.rejected += 1
+            delay = self.latency_s + self._rng.uniform(0, self.jitter_s) + max(0, over) * self.latency_s
+        if reject:
+            time.sleep(delay / 4)
+            self._exit()
+            raise FakeRateLimitError("429 Resource has been exhausted (fake provider)")
+        return delay
+
+    def _exit(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None,
+                         request_options: Optional[Dict[str, Any]] = None):
+        delay = self._enter()
+        timeout = (request_options or {}).get("timeout")
+        if stream:
+            return self._stream(delay, timeout)
+        try:
+            self._wait(delay, timeout)
+            return _Resp(self.response)
+        finally:
+            self._exit()
+
+    @staticmethod
+    def _wait(delay: float, timeout: Optional[float]) -> None:
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("504 Deadline Exceeded (fake provider request timeout)")
+        time.sleep(delay)
+
+    def _stream(self, delay: float, timeout: Optional[float] = None) -> Iterator[_Resp]:
+        try:
+            self._wait(delay, timeout)
+            for i in range(0, len(self.response), self.chunk_size):
+                yield _Resp(self.response[i:i + self.chunk_size])
+        finally:
+            self._exit()
@@ -0,0 +1,261 @@
+from __future__ import annotations
+from pathlib import Path
+import csv
+import json
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Offline execution backend: runs linted drafts against local sample data
+# (one CSV/JSON/Parquet file per contract entity) in an in-memory SQLite db.
+# Tables load lazily on first reference and stay cached until the file changes.
+
+_DEFAULT_SAMPLES_DIR = Path(".smartsql") / "samples"
+_EXTENSIONS = (".csv", ".json", ".jsonl", ".parquet")
+
+_TABLE_REF = re.compile(r"`([^`]+)`")
+
+# BigQuery type name -> SQLite column affinity
+_SQLITE_TYPES = {
+    "STRING": "TEXT", "BYTES": "BLOB",
+    "INT64": "INTEGER", "INTEGER": "INTEGER", "BOOL": "INTEGER", "BOOLEAN": "INTEGER",
+    "FLOAT64": "REAL", "FLOAT": "REAL", "NUMERIC": "REAL", "BIGNUMERIC": "REAL",
+    "TIMESTAMP": "TEXT", "DATETIME": "TEXT", "DATE": "TEXT", "TIME": "TEXT",
+}
+
+# BigQuery INTERVAL unit -> (multiplier, SQLite date modifier unit)
+_INTERVAL_UNITS = {
+    "SECOND": (1, "seconds"), "MINUTE": (1, "minutes"), "HOUR": (1, "hours"), "DAY": (1, "days"),
+    "WEEK": (7, "days"), "MONTH": (1, "months"), "QUARTER": (3, "months"), "YEAR": (1, "years"),
+}
+
+_QUOTED = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")")
+
+def _samples_dir(samples_dir: Optional[str]) -> Path:
+    return Path(samples_dir) if samples_dir else _DEFAULT_SAMPLES_DIR
+
+def find_sample_file(table: str, samples_dir: Optional[str] = None) -> Optional[Path]:
+    """Return the sample data file for `table`, checking `<dir>/<table>.<ext>` then `<dir>/<dataset>/<table>.<ext>`."""
+    base = _samples_dir(samples_dir)
+    name = table.split(".")[-1]
+    candidates = [base / name]
+    if "." in table:
+        candidates.insert(0, base / table.split(".")[-2] / name)
+    for stem in candidates:
+        for ext in _EXTENSIONS:
+            p = stem.with_suffix(ext)
+            if p.exists():
+                return p
+    return None
+
+def _read_rows(path: Path) -> List[Dict[str, Any]]:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            return [dict(r) for r in csv.DictReader(f)]
+    if suffix == ".jsonl":
+        with path.open("r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    if suffix == ".json":
+        obj = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(obj, dict):
+            obj = obj.get("rows") or []
+        return list(obj)
+    if suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet sample data requires pyarrow (pip install pyarrow).") from e
+        return pq.read_table(str(path)).to_pylist()
+    raise ValueError(f"Unsupported sample data format: {path.name}")
+
+def _to_sqlite_value(v: Any) -> Any:
+    if isinstance(v, bool):
+        return int(v)
+    if v is None or isinstance(v, (int, float, str, bytes)):
+        return v
+    if isinstance(v, (dict, list)):
+        return json.dumps(v)
+    return str(v)
+
+def _coerce(v: Any, bq_type: str) -> Any:
+    """CSV gives strings for everything; coerce to the contract's declared type."""
+    if v is None or v == "":
+        return None
+    if not isinstance(v, str):
+        return _to_sqlite_value(v)
+    if bq_type in {"INT64", "INTEGER"}:
+        try:
+            return int(v)
+        except ValueError:
+            return v
+    if bq_type in {"FLOAT64", "FLOAT", "NUMERIC", "BIGNUMERIC"}:
+        try:
+            return float(v)
+        except ValueError:
+            return v
+    if bq_type in {"BOOL", "BOOLEAN"}:
+        return 1 if v.strip().lower() in {"1", "true", "yes", "t"} else 0
+    if bq_type == "TIMESTAMP":
+        # normalise ISO-8601 so text comparison against datetime('now', ...) works
+        return v.replace("T", " ").rstrip("Z")
+    return v
+
+def to_sqlite_sql(sql: str) -> str:
+    """
+    Best-effort BigQuery StandardSQL -> SQLite shim.
+    Covers the constructs AnalystAgent drafts: backticked dataset.table names,
+    CURRENT_TIMESTAMP()/CURRENT_DATE(), TIMESTAMP/DATE literals, TIMESTAMP_SUB/DATE_SUB
+    with INTERVAL (unsupported units raise ValueError),
+    SAFE_DIVIDE, CAST(... AS INT64/FLOAT64/STRING/BOOL) and COUNTIF.
+    """
+    s = (sql or "").strip().rstrip(";")
+    # `dataset.table` / `project.dataset.table` -> "table"
+    s = _TABLE_REF.sub(lambda m: '"' + m.group(1).split(".")[-1] + '"', s)
+
+    def _interval(m: "re.Match[str]") -> str:
+        fn, base, n, unit = m.group(1).upper(), m.group(2).strip(), int(m.group(3)), m.group(4).upper()
+        if unit not in _INTERVAL_UNITS:
+            raise ValueError(f"Local engine does not support INTERVAL unit {unit}.")
+        mult, sqlite_unit = _INTERVAL_UNITS[unit]
+        mod = f"'-{n * mult} {sqlite_unit}'"
+        if fn.startswith("DATE"):
+            return f"date({base}, {mod})"
+        return f"datetime({base}, {mod})"
+
+    # TIMESTAMP('2020-01-01') / TIMESTAMP '2020-01-01' (same for DATE/DATETIME) -> datetime()/date()
+    s = re.sub(r"\b(TIMESTAMP|DATETIME|DATE)\s*(?:\(\s*('[^']*')\s*\)|('[^']*'))",
+               lambda m: ("date" if m.group(1).upper() == "DATE" else "datetime") + f"({m.group(2) or m.group(3)})",
+               s, flags=re.I)
+    s = re.sub(r"\bCURRENT_TIMESTAMP\s*\(\s*\)", "datetime('now')", s, flags=re.I)
+    s = re.sub(r"\bCURRENT_DATETIME\s*\(\s*\)", "datetime('now')", s, flags=re.I)
+    s = re.sub(r"\bCURRENT_DATE\s*\(\s*\)", "date('now')", s, flags=re.I)
+    s = re.sub(
+        r"\b(TIMESTAMP_SUB|DATETIME_SUB|DATE_SUB)\s*\(\s*(.+?)\s*,\s*INTERVAL\s+(\d+)\s+(\w+)\s*\)",
+        _interval, s, flags=re.I,
+    )
+    s = re.sub(r"\bSAFE_DIVIDE\s*\(", "_safe_divide(", s, flags=re.I)
+    s = re.sub(r"\bCOUNTIF\s*\(", "_countif(", s, flags=re.I)
+    s = re.sub(r"\bAS\s+INT64\b", "AS INTEGER", s, flags=re.I)
+    s = re.sub(r"\bAS\s+FLOAT64\b", "AS REAL", s, flags=re.I)
+    s = re.sub(r"\bAS\s+(STRING|TIMESTAMP|DATETIME|DATE)\b", "AS TEXT", s, flags=re.I)
+    s = re.sub(r"\bAS\s+(BOOL|BOOLEAN)\b", "AS INTEGER", s, flags=re.I)
+    # TRUE/FALSE literals, leaving quoted strings alone
+    parts = _QUOTED.split(s)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\bFALSE\b", "0", re.sub(r"\bTRUE\b", "1", parts[i], flags=re.I), flags=re.I)
+    return "".join(parts)
+
+def _safe_divide(a: Any, b: Any) -> Optional[float]:
+    try:
+        return None if a is None or not b else float(a) / float(b)
+    except (TypeError, ValueError):
+        return None
+
+class _CountIf:
+    def __init__(self):
+        self.n = 0
+
+    def step(self, v: Any) -> None:
+        if v:
+            self.n += 1
+
+    def finalize(self) -> int:
+        return self.n
+
+class LocalEngine:
+    """In-memory SQLite engine with a per-table cache keyed by sample file mtime."""
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.create_function("_safe_divide", 2, _safe_divide)
+        self._conn.create_aggregate("_countif", 1, _CountIf)
+        self._loaded: Dict[str, Tuple[str, float]] = {}  # table -> (path, mtime)
+        self._lock = threading.Lock()
+
+    def _ensure_table(self, table: str, path: Path, fields: Dict[str, Dict[str, Any]]) -> None:
+        mtime = path.stat().st_mtime
+        if self._loaded.get(table) == (str(path), mtime):
+            return
+        rows = _read_rows(path)
+        types = {k: (v.get("type") or "STRING").upper() for k, v in fields.items()}
+        cols: List[str] = list(fields.keys())
+        for r in rows:
+            for k in r.keys():
+                if k not in cols:
+                    cols.append(k)
+        col_defs = ", ".join(f'"{c}" {_SQLITE_TYPES.get(types.get(c, "STRING"), "TEXT")}' for c in cols)
+        placeholders = ", ".join("?" for _ in cols)
+        cur = self._conn.cursor()
+        cur.execute(f'DROP TABLE IF EXISTS "{table}"')
+        cur.execute(f'CREATE TABLE "{table}" ({col_defs})')
+        cur.executemany(
+            f'INSERT INTO "{table}" VALUES ({placeholders})',
+            [tuple(_coerce(r.get(c), types.get(c, "STRING")) for c in cols) for r in rows],
+        )
+        self._conn.commit()
+        self._loaded[table] = (str(path), mtime)
+
+    def run(self, sql: str, entities: Dict[str, Any], samples_dir: Optional[str], max_rows: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]], int]:
+        tables = sorted({t.split(".")[-1] for t in _TABLE_REF.findall(sql or "")})
+        if not tables:
+            raise ValueError("No backticked tables found to load from sample data.")
+        with self._lock:
+            bytes_loaded = 0
+            for t in tables:
+                path = find_sample_file(t, samples_dir)
+                if path is None:
+                    raise FileNotFoundError(f"No sample data for table '{t}' under {_samples_dir(samples_dir)}/ (expected {t}.csv|json|jsonl|parquet).")
+                self._ensure_table(t, path, ((entities.get(t) or {}).get("fields") or {}))
+                bytes_loaded += path.stat().st_size
+            cur = self._conn.execute(to_sqlite_sql(sql))
+            names = [d[0] for d in cur.description or []]
+            fetched = cur.fetchmany(max_rows)
+        rows = [dict(zip(names, r)) for r in fetched]
+        schema = [{"name": n, "type": _infer_type(rows, n), "mode": "NULLABLE"} for n in names]
+        return rows, schema, bytes_loaded
+
+def _infer_type(rows: List[Dict[str, Any]], name: str) -> str:
+    for r in rows:
+        v = r.get(name)
+        if v is None:
+            continue
+        if isinstance(v, int):
+            return "INTEGER"
+        if isinstance(v, float):
+            return "FLOAT"
+        if isinstance(v, bytes):
+            return "BYTES"
+        return "STRING"
+    return "STRING"
+
+_engine: Optional[LocalEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> LocalEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = LocalEngine()
+        return _engine
+
+def has_sample_data(sql: str, samples_dir: Optional[str] = None) -> bool:
+    tables = {t.split(".")[-1] for t in _TABLE_REF.findall(sql or "")}
+    return bool(tables) and all(find_sample_file(t, samples_dir) is not None for t in tables)
+
+def execute(sql: str, dataset: str, entities: Optional[Dict[str, Any]] = None, samples_dir: Optional[str] = None, max_rows: int = 200) -> Dict[str, Any]:
+    """Run `sql` against local sample data. Returns the same shape as bq_exec.execute."""
+    rows, schema, bytes_loaded = get_engine().run(sql, entities or {}, samples_dir, max_rows)
+    return {
+        "status": "ok",
+        "rowcount": len(rows),
+        "schema": schema,
+        "rows": rows,
+        "bytes_processed": int(bytes_loaded),
+        "slot_ms": 0,
+        "dataset": dataset,
+        "billing_project": "offline",
+        "location": "local",
+        "engine": "sqlite",
+    }
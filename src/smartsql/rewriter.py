@@ -0,0 +1,160 @@
+from __future__ import annotations
+import difflib
+import re
+from typing import Any, Dict, List, Optional
+
+from smartsql.catalog import get_local_catalog
+from smartsql.sql_policy import strip_sql_comments, entity_time_fields
+
+# Deterministic scan-reducing rewrites applied between drafting and execution:
+#   1. default time window on the partition (or first declared time) column
+#   2. LIMIT enforced / capped
+#   3. SELECT * narrowed to the referenced contract columns -- opt-in only
+#      (prune_columns=True), since it changes the result schema; otherwise it
+#      is reported under "suggestions"
+# Comments are stripped first so nothing injected can end up inside one.
+# Only single-SELECT queries over one base table are rewritten for (1) and (3);
+# anything fancier (CTEs, subqueries, joins) is left alone and reported as skipped.
+
+# clauses that may follow FROM <table> [alias]; also the words that can never be an alias
+_TAIL_KEYWORDS = ("GROUP", "HAVING", "QUALIFY", "WINDOW", "ORDER", "LIMIT")
+_NOT_ALIAS = _TAIL_KEYWORDS + ("WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "FULL", "CROSS", "UNION", "TABLESAMPLE", "FOR")
+_TAIL_CLAUSES = re.compile(r"\b(GROUP\s+BY|HAVING|QUALIFY|WINDOW|ORDER\s+BY|LIMIT)\b", re.I)
+_FROM_TABLE = re.compile(
+    r"\bFROM\s+`([^`]+)`(?:\s+(?:AS\s+)?(?!(?:" + "|".join(_NOT_ALIAS) + r")\b)([A-Za-z_]\w*))?", re.I)
+_SELECT_STAR = re.compile(r"^(\s*SELECT\s+(?:DISTINCT\s+)?)\*(\s+FROM\b)", re.I)
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\b", re.I)
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+def _depths(sql: str) -> List[Optional[int]]:
+    """Paren depth at each character; None inside quotes/backticks (quote chars included)."""
+    out: List[Optional[int]] = []
+    depth, quote = 0, None
+    for ch in sql:
+        if quote:
+            if ch == quote:
+                quote = None
+            out.append(None)
+            continue
+        if ch in "'\"`":
+            quote = ch
+            out.append(None)
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        out.append(depth)
+    return out
+
+def _top_level(pattern: "re.Pattern[str]", sql: str, start: int = 0) -> Optional["re.Match[str]"]:
+    """First match at paren depth 0 that is not inside a string literal or quoted identifier."""
+    depth = _depths(sql)
+    for m in pattern.finditer(sql, start):
+        if depth[m.start()] == 0:
+            return m
+    return None
+
+def _window_expr(col: str, ftype: str, days: int) -> str:
+    if ftype == "DATE":
+        return f"{col} >= DATE_SUB(CURRENT_DATE(), INTERVAL {days} DAY)"
+    if ftype == "DATETIME":
+        return f"{col} >= DATETIME_SUB(CURRENT_DATETIME(), INTERVAL {days} DAY)"
+    return f"{col} >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {days} DAY)"
+
+def _has_window(sql: str, fields: List[str]) -> bool:
+    return any(re.search(rf"\b{re.escape(f)}\b\s*(>=|>|BETWEEN)", sql, re.I) for f in fields)
+
+def _add_filter(sql: str, cond: str, from_end: int) -> str:
+    where = _top_level(re.compile(r"\bWHERE\b", re.I), sql, from_end)
+    tail = _top_level(_TAIL_CLAUSES, sql, where.end() if where else from_end)
+    cut = tail.start() if tail else len(sql)
+    if where:
+        body = sql[where.end():cut].strip()
+        return f"{sql[:where.start()]}WHERE {cond} AND ({body}) {sql[cut:]}".rstrip()
+    return f"{sql[:cut].rstrip()} WHERE {cond} {sql[cut:]}".rstrip()
+
+def rewrite_sql(
+    sql: str,
+    dataset: str,
+    contract: Dict[str, Any],
+    catalog: Optional[Dict[str, Any]] = None,
+    window_days: int = 30,
+    max_limit: int = 5000,
+    prune_columns: bool = False,
+) -> Dict[str, Any]:
+    """
+    Returns {"sql", "original_sql", "changed", "changes": [...], "suggestions": [...], "skipped": [...], "diff"}.
+    `window_days` / `max_limit` can be overridden by contract policy
+    (default_window_days / max_limit).
+    """
+    policy = contract.get("policy") or {}
+    window_days = int(policy.get("default_window_days") or window_days)
+    max_limit = int(policy.get("max_limit") or max_limit)
+    entities = contract.get("entities") or {}
+    cat = catalog if catalog is not None else (get_local_catalog() or {})
+
+    original = (sql or "").strip().rstrip(";").strip()
+    changes: List[str] = []
+    suggestions: List[str] = []
+    skipped: List[str] = []
+    s = strip_sql_comments(original).strip()
+    if s != original:
+        s = "\n".join(line.rstrip() for line in s.splitlines() if line.strip())
+        changes.append("removed SQL comments")
+
+    simple = not re.match(r"^\s*WITH\b", s, re.I) and not re.search(r"\bJOIN\b", s, re.I) \
+        and len(re.findall(r"\bSELECT\b", s, re.I)) == 1
+    frm = _top_level(_FROM_TABLE, s) if simple else None
+    table = frm.group(1).split(".")[-1] if frm else None
+    entity = entities.get(table) if table else None
+    if not simple or entity is None:
+        skipped.append("time window/column pruning: only single-table SELECTs over contract entities are rewritten")
+    else:
+        alias = frm.group(2)
+        fields = entity.get("fields") or {}
+
+        # 1. SELECT * -> referenced contract columns
+        star = _SELECT_STAR.match(s)
+        if star:
+            rest = s[star.end():]
+            idents = {t.lower() for t in _IDENT.findall(re.sub(r"`[^`]*`", " ", rest))}
+            cols = [f for f in fields if f.lower() in idents] or list(fields.keys())
+            if prune_columns:
+                s = star.group(1) + ", ".join(cols) + star.group(2) + rest
+                changes.append(f"narrowed SELECT * to {len(cols)} column(s): {', '.join(cols)}")
+                frm = _top_level(_FROM_TABLE, s)
+            else:
+                suggestions.append(f"SELECT * scans every column; selecting only {', '.join(cols)} would reduce bytes (prune_columns=true)")
+
+        # 2. default time window on the partition column
+        tfields = entity_time_fields(entity)
+        require = bool(policy.get("require_time_window", True))
+        if require and tfields and not _has_window(s, tfields + [f"{alias}.{f}" for f in tfields if alias]):
+            tentry = (((cat.get("datasets") or {}).get(dataset) or {}).get(table) or {})
+            pfield = (tentry.get("partition") or {}).get("field")
+            col = pfield if pfield in fields else tfields[0]
+            ftype = (fields.get(col, {}).get("type") or "TIMESTAMP").upper()
+            ref = f"{alias}.{col}" if alias else col
+            s = _add_filter(s, _window_expr(ref, ftype, window_days), frm.end())
+            changes.append(f"added {window_days}-day time window on {col}" + (" (partition column)" if col == pfield else ""))
+
+    # 3. LIMIT (top-level only)
+    lim = _top_level(_LIMIT, s)
+    if lim is None:
+        s = f"{s}\nLIMIT {max_limit}"
+        changes.append(f"added LIMIT {max_limit}")
+    elif int(lim.group(1)) > max_limit:
+        s = s[:lim.start()] + f"LIMIT {max_limit}" + s[lim.end():]
+        changes.append(f"capped LIMIT {lim.group(1)} to {max_limit}")
+
+    diff = "\n".join(difflib.unified_diff(original.splitlines(), s.splitlines(), "draft.sql", "rewritten.sql", lineterm=""))
+    return {
+        "sql": s,
+        "original_sql": original,
+        "changed": s != original,
+        "changes": changes,
+        "suggestions": suggestions,
+        "skipped": skipped,
+        "diff": diff,
+    }
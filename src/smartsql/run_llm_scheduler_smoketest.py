@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from smartsql.llm import LLMScheduler, LLMDeadlineExceeded
+from smartsql.llm_fake import FakeModel, FakeRateLimitError
+
+# Fake provider that 429s above 4 concurrent calls plus 5% random 429s.
+model = FakeModel(latency_s=0.1, jitter_s=0.05, error_rate=0.05, capacity=4, seed=7)
+sched = LLMScheduler(rate_per_s=50, burst=20, max_concurrency=12, initial_concurrency=8,
+                     target_latency_s=0.3, base_backoff_s=0.05, max_backoff_s=0.5)
+
+done = {"interactive": [], "batch": []}
+failed = {"interactive": 0, "batch": 0}
+lock = threading.Lock()
+
+def worker(priority: str):
+    t0 = time.monotonic()
+    try:
+        sched.call(lambda t: model.generate_content("ping", request_options={"timeout": t}), priority=priority,
+                   deadline_s=float(os.getenv("DEADLINE_S", "10")))
+        with lock:
+            done[priority].append(time.monotonic() - t0)
+    except Exception:
+        with lock:
+            failed[priority] += 1
+
+threads = [threading.Thread(target=worker, args=("batch",)) for _ in range(40)]
+threads += [threading.Thread(target=worker, args=("interactive",)) for _ in range(10)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+
+p50 = {}
+for p in ("interactive", "batch"):
+    lat = sorted(done[p])
+    p50[p] = lat[len(lat) // 2] if lat else 0
+    print(f"{p:11s} ok={len(lat)} failed={failed[p]} p50={p50[p]:.2f}s max={(lat[-1] if lat else 0):.2f}s")
+stats = sched.stats()
+print("provider calls:", model.calls, "rejected(429):", model.rejected)
+print("scheduler:", stats)
+
+assert failed == {"interactive": 0, "batch": 0}, failed
+assert p50["interactive"] < p50["batch"], p50
+assert stats["rate_limited"] > 0, stats
+assert stats["limit"] < 8, stats  # backed off from initial_concurrency under 429s
+
+# rate=0 means no rate limit (must not divide by zero)
+unlimited = LLMScheduler(rate_per_s=0, burst=0)
+assert unlimited.call(lambda t: "ok") == "ok"
+
+# a stream abandoned by its consumer frees the slot without shrinking the limit
+before = unlimited.stats()["limit"]
+gen = unlimited.stream(lambda t: iter(["a", "b", "c"]))
+assert next(gen) == "a"
+gen.close()
+after = unlimited.stats()
+assert after["in_flight"] == 0 and after["limit"] == before and after["cancelled"] == 1, after
+# the provider call gets the time left as its timeout; nothing starts past the deadline
+seen = []
+assert unlimited.call(lambda t: seen.append(t) or "ok", deadline_s=2.0) == "ok" and 0 < seen[0] <= 2.0, seen
+try:
+    unlimited.call(lambda t: seen.append(t), deadline_s=0)
+    raise AssertionError("expired deadline should not start a call")
+except LLMDeadlineExceeded:
+    assert len(seen) == 1
+
+# a burst of concurrent 429s halves the limit once, not once per call
+burst = LLMScheduler(rate_per_s=0, burst=1, max_concurrency=8, initial_concurrency=8, target_latency_s=10, max_retries=0)
+barrier = threading.Barrier(4)
+
+def rejected(_t):
+    barrier.wait()
+    raise FakeRateLimitError("429")
+
+def burst_worker():
+    try:
+        burst.call(rejected)
+    except FakeRateLimitError:
+        pass
+
+threads = [threading.Thread(target=burst_worker) for _ in range(4)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert burst.stats()["limit"] == 4 and burst.stats()["rate_limited"] == 4, burst.stats()
+print("OK")
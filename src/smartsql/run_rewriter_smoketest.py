@@ -0,0 +1,91 @@
+import tempfile
+from pathlib import Path
+from smartsql.rewriter import rewrite_sql
+from smartsql.estimator import estimate_bytes
+from smartsql.local_exec import execute
+from smartsql.sql_policy import lint_sql
+
+contract = {"entities": {"spans": {"fields": {
+    "trace_id": {"type": "STRING"}, "agent_name": {"type": "STRING"},
+    "cost_usd": {"type": "NUMERIC"}, "ts": {"type": "TIMESTAMP"}}}}}
+catalog = {"datasets": {"prod": {"spans": {
+    "row_count": 1000, "partition": {"field": "ts", "type": "DAY", "count": 365},
+    "fields": {"trace_id": {"type": "STRING"}, "agent_name": {"type": "STRING"},
+               "cost_usd": {"type": "NUMERIC"}, "ts": {"type": "TIMESTAMP"}}}}}}
+TF = ["ts"]
+
+def rw(sql, **kw):
+    out = rewrite_sql(sql, "prod", contract, catalog=catalog, **kw)
+    print("----")
+    print(sql)
+    print("=>", out["sql"].replace("\n", " "), out["changes"], out["suggestions"])
+    return out
+
+# comments: the injected window must not land inside a comment, and lint must not trust comment text
+r = rw("SELECT COUNT(*) FROM `prod.spans` -- count all")
+assert "--" not in r["sql"] and "ts >= TIMESTAMP_SUB" in r["sql"], r["sql"]
+assert not any(v["code"] == "MISSING_TIME_WINDOW" for v in lint_sql(r["sql"], "prod", time_fields=TF))
+assert any(v["code"] == "MISSING_TIME_WINDOW" for v in lint_sql("SELECT 1 FROM `prod.spans` -- ts >= x", "prod", time_fields=TF))
+assert estimate_bytes("SELECT ts FROM `prod.spans` /* ts >= '2026-01-01' */", "prod", catalog)["tables"]["spans"]["partition_fraction"] == 1.0
+
+# QUALIFY/WINDOW are clauses, not aliases
+r = rw("SELECT agent_name FROM `prod.spans` QUALIFY ROW_NUMBER() OVER (PARTITION BY agent_name ORDER BY ts) = 1")
+assert "QUALIFY.ts" not in r["sql"] and r["sql"].index("WHERE") < r["sql"].index("QUALIFY"), r["sql"]
+
+# alias is still picked up
+r = rw("SELECT t1.agent_name FROM `prod.spans` AS t1 GROUP BY t1.agent_name")
+assert "t1.ts >= TIMESTAMP_SUB" in r["sql"], r["sql"]
+
+# SELECT * keeps its schema unless pruning is opted into
+r = rw("SELECT * FROM `prod.spans` WHERE ts >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 1 DAY) LIMIT 10")
+assert r["sql"].startswith("SELECT * FROM") and not r["changed"] and r["suggestions"], r
+r = rw("SELECT * FROM `prod.spans` WHERE ts >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 1 DAY) LIMIT 10", prune_columns=True)
+assert r["sql"].startswith("SELECT ts FROM"), r["sql"]
+
+# LIMIT added / capped; OR predicates stay grouped
+r = rw("SELECT agent_name FROM `prod.spans` WHERE agent_name = 'a' OR cost_usd > 1 LIMIT 100000")
+assert "AND (agent_name = 'a' OR cost_usd > 1)" in r["sql"] and r["sql"].endswith("LIMIT 5000"), r["sql"]
+
+# clause keywords inside string literals are not clauses
+r = rw("SELECT agent_name FROM `prod.spans` WHERE agent_name = 'see ORDER BY docs'")
+assert "AND (agent_name = 'see ORDER BY docs')" in r["sql"] and r["sql"].endswith("LIMIT 5000"), r["sql"]
+r = rw("SELECT agent_name FROM `prod.spans` WHERE agent_name = 'LIMIT 99999'")
+assert "(agent_name = 'LIMIT 99999')" in r["sql"] and r["sql"].endswith("LIMIT 5000"), r["sql"]
+
+# estimator: 30-day window over 365 daily partitions, only referenced columns
+est = estimate_bytes("SELECT cost_usd FROM `prod.spans` WHERE ts >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 DAY)", "prod", catalog)
+print("----\nestimate:", est["bytes_processed"], est["tables"])
+assert est["tables"]["spans"]["columns"] == ["cost_usd", "ts"] and est["bytes_processed"] == int(24000 * 30 / 365)
+
+# estimator: an unrelated AND predicate doesn't end the window; tables without stats are unpriced
+orders = {"datasets": {"prod": {"orders": {"row_count": 1000, "partition": {"field": "d", "type": "DAY", "count": 3650},
+                                           "fields": {"d": {"type": "DATE"}, "shipped": {"type": "DATE"}}}}}}
+est = estimate_bytes("SELECT d FROM `prod.orders` WHERE d >= '2026-01-01' AND shipped < '2025-01-01'", "prod", orders)
+assert est["tables"]["orders"]["partition_fraction"] > 100 / 3650, est
+est = estimate_bytes("SELECT ts FROM `prod.spans`", "prod", {"datasets": {"prod": {"spans": {"fields": {"ts": {"type": "TIMESTAMP"}}}}}})
+assert est["missing_stats"] == ["prod.spans"] and not est["complete"] and "spans" not in est["tables"], est
+
+# local engine: WEEK intervals, timestamp literals, quoted TRUE
+with tempfile.TemporaryDirectory() as d:
+    rows = ["trace_id,agent_name,cost_usd,ts"]
+    from datetime import datetime, timedelta
+    now = datetime.utcnow()
+    for i in range(30):
+        rows.append(f"t{i},{'a' if i % 2 else 'b'},{i},{(now - timedelta(days=i, hours=1)).isoformat()}Z")
+    Path(d, "spans.csv").write_text("\n".join(rows) + "\n")
+    ents = contract["entities"]
+    def count(where):
+        return execute(f"SELECT COUNT(*) AS n FROM `prod.spans` WHERE {where}", "prod", ents, samples_dir=d)["rows"][0]["n"]
+    assert count("ts >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 2 WEEK)") == 14
+    assert count("ts >= TIMESTAMP('2020-01-01')") == 30
+    assert count("ts >= TIMESTAMP '2020-01-01'") == 30
+    res = execute("SELECT agent_name, SUM(cost_usd) AS s, 'TRUE' AS lit FROM `prod.spans` GROUP BY agent_name ORDER BY agent_name", "prod", ents, samples_dir=d)
+    print("----\nlocal:", res["rows"])
+    assert res["rows"][0]["lit"] == "TRUE" and res["rows"][0]["s"] == sum(range(1, 30, 2))
+    try:
+        execute("SELECT 1 FROM `prod.spans` WHERE ts >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 1 FORTNIGHT)", "prod", ents, samples_dir=d)
+        raise AssertionError("unsupported INTERVAL unit should raise")
+    except ValueError:
+        pass
+
+print("----\nrewriter/estimator/local engine smoke OK")
@@ -0,0 +1,40 @@
+"""
+Cold-start benchmark: imports smartsql.api in a fresh interpreter with
+`-X importtime`, prints the slowest modules (cumulative) and exits non-zero
+when the total exceeds SMARTSQL_IMPORT_BUDGET_MS (default 1500).
+"""
+import os
+import re
+import subprocess
+import sys
+
+TARGET = os.getenv("SMARTSQL_IMPORT_TARGET", "smartsql.api")
+BUDGET_MS = float(os.getenv("SMARTSQL_IMPORT_BUDGET_MS", "1500"))
+TOP = int(os.getenv("SMARTSQL_IMPORT_TOP", "15"))
+
+proc = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+    capture_output=True, text=True, env=os.environ.copy(),
+)
+if proc.returncode != 0:
+    print(proc.stderr[-2000:])
+    sys.exit(f"import {TARGET} failed")
+
+# lines: "import time: self [us] | cumulative | imported package"
+rows = []
+for line in proc.stderr.splitlines():
+    m = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+    if m:
+        rows.append((int(m.group(2)) / 1000.0, int(m.group(1)) / 1000.0, len(m.group(3)), m.group(4)))
+
+total = next((cum for cum, _self, _depth, name in rows if name == TARGET), 0.0)
+print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+for cum, self_ms, _depth, name in sorted(rows, reverse=True)[:TOP]:
+    print(f"{cum:14.1f} {self_ms:9.1f}  {name}")
+heavy = sorted({name.split(".")[0] for _c, _s, _d, name in rows} & {"langgraph", "langchain_core", "google", "dotenv", "grpc"})
+print(f"\nimport {TARGET}: {total:.1f} ms (budget {BUDGET_MS:.0f} ms)")
+if heavy:
+    print(f"eagerly imported heavy packages: {', '.join(heavy)}")
+if total > BUDGET_MS:
+    sys.exit(f"FAIL: import time {total:.1f} ms exceeds budget {BUDGET_MS:.0f} ms")
+print("OK")
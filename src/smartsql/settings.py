@@ -1,11 +1,9 @@
 from __future__ import annotations
 from pathlib import Path
-import json
 from typing import Any, Dict
+from smartsql.state import get_json, update_json
 
-_DATA_DIR = Path(".smartsql")
-_DATA_DIR.mkdir(exist_ok=True)
-_SETTINGS_FILE = _DATA_DIR / "settings.json"
+_LEGACY_FILE = Path(".smartsql") / "settings.json"
 
 _DEFAULTS: Dict[str, Any] = {
     # BigQuery (all optional; leave None while offline)
@@ -15,6 +13,9 @@ _DEFAULTS: Dict[str, Any] = {
     "location": None,           # e.g., "US" or "EU"
     "auth_mode": "adc",         # "adc" | "service_account" | "oauth"
 
+    # Offline execution: directory of <table>.csv|json|jsonl|parquet sample files
+    "sample_data_dir": None,    # defaults to .smartsql/samples
+
     # LLM providers toggles (keys in .env or secret manager; not stored here)
     "providers": {
         "gemini": True,
@@ -25,18 +26,7 @@ _DEFAULTS: Dict[str, Any] = {
     }
 }
 
-def _read() -> Dict[str, Any]:
-    if not _SETTINGS_FILE.exists():
-        return dict(_DEFAULTS)
-    try:
-        return json.loads(_SETTINGS_FILE.read_text(encoding="utf-8"))
-    except Exception:
-        return dict(_DEFAULTS)
-
-def get_settings_store() -> Dict[str, Any]:
-    """Return current settings (defaults if none saved)."""
-    # always merge over defaults to avoid missing keys
-    cur = _read()
+def _merge(cur: Dict[str, Any]) -> Dict[str, Any]:
     merged = dict(_DEFAULTS)
     # shallow merge for providers
     prov = dict(_DEFAULTS["providers"])
@@ -45,12 +35,20 @@ def get_settings_store() -> Dict[str, Any]:
     merged["providers"] = prov
     return merged
 
+def get_settings_store() -> Dict[str, Any]:
+    """Return current settings (defaults if none saved)."""
+    # always merge over defaults to avoid missing keys
+    return _merge(get_json("settings", default={}, legacy_file=_LEGACY_FILE) or {})
+
 def set_settings_store(new: Dict[str, Any]) -> None:
     """Persist provided settings (partial allowed)."""
-    cur = get_settings_store()
-    cur.update({k: v for k, v in (new or {}).items() if k in _DEFAULTS})
-    if "providers" in (new or {}):
-        prov = dict(_DEFAULTS["providers"])
-        prov.update(new["providers"] or {})
-        cur["providers"] = prov
-    _SETTINGS_FILE.write_text(json.dumps(cur, indent=2), encoding="utf-8")
+    def _apply(stored: Dict[str, Any]) -> Dict[str, Any]:
+        cur = _merge(stored or {})
+        cur.update({k: v for k, v in (new or {}).items() if k in _DEFAULTS})
+        if "providers" in (new or {}):
+            prov = dict(_DEFAULTS["providers"])
+            prov.update(new["providers"] or {})
+            cur["providers"] = prov
+        return cur
+    get_json("settings", legacy_file=_LEGACY_FILE)  # migrate an old settings.json first
+    update_json("settings", _apply, default={})
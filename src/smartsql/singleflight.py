@@ -0,0 +1,136 @@
+from __future__ import annotations
+import asyncio
+import copy
+import functools
+import inspect
+import json
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Single-flight: identical in-flight calls (same canonical key) share one
+# execution. The first caller (leader) runs the work; concurrent followers wait
+# for its result instead of issuing duplicate LLM/BigQuery calls. Nothing is
+# cached once the leader finishes. Every caller gets its own deep copy of the
+# result, since API handlers mutate the dicts they get back.
+# Sync callers (FastAPI threadpool, asyncio.to_thread) coalesce via threads;
+# `async def` functions decorated with @singleflight coalesce per event loop.
+
+def normalize_sql(sql: str) -> str:
+    """Whitespace/semicolon-insensitive form of `sql` for use in keys."""
+    return re.sub(r"\s+", " ", (sql or "").strip().rstrip(";")).strip()
+
+def canonical_key(*parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, default=str)
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[tuple, "asyncio.Future[Any]"] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() once per key among concurrent callers (thread-safe)."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return copy.deepcopy(call.result)
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of do(); dedupes within the running event loop."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(loop_key)
+            if task is None:
+                task = self._tasks[loop_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _t: self._forget(loop_key))
+            else:
+                self.coalesced += 1
+        # shield: a cancelled follower must not cancel the leader's work
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _forget(self, loop_key: tuple) -> None:
+        with self._lock:
+            self._tasks.pop(loop_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.calls - self.coalesced,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
+
+def singleflight(group: str, key: Callable[[Dict[str, Any]], str]):
+    """
+    Decorator: coalesce concurrent calls whose key(arguments) match, where
+    `arguments` maps parameter names to values (defaults applied).
+    Works on plain and `async def` functions/methods.
+    """
+    sf = get_group(group)
+
+    def deco(fn):
+        sig = inspect.signature(fn)
+
+        def _key(args, kwargs) -> str:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return key(bound.arguments)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return await sf.do_async(_key(args, kwargs), lambda: fn(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return sf.do(_key(args, kwargs), lambda: fn(*args, **kwargs))
+        return wrapper
+    return deco
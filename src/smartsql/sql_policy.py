@@ -1,10 +1,16 @@
 import re
-from typing import List, Dict
+from typing import Any, List, Dict
 
 FORBIDDEN = re.compile(r'\b(INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|MERGE|TRUNCATE|BEGIN|COMMIT)\b', re.I)
 CROSS_OR_NATURAL = re.compile(r'\b(CROSS\s+JOIN|NATURAL\s+JOIN)\b', re.I)
 JOIN_NO_ON = re.compile(r'\bJOIN\b(?![^;]*\bON\b)', re.I)  # naive: JOIN without ON in same statement
 
+_COMMENT_OR_QUOTED = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)|--[^\n]*|#[^\n]*|/\*.*?\*/""", re.S)
+
+def strip_sql_comments(sql: str) -> str:
+    """Remove -- / # / /* */ comments (outside quotes), so checks never match comment text."""
+    return _COMMENT_OR_QUOTED.sub(lambda m: m.group(1) or " ", sql or "")
+
 def lint_sql(sql: str, dataset: str, require_time_window: bool = True, time_fields: List[str] | None = None) -> List[Dict]:
     """
     Returns a list of violations: {code, severity, message}
@@ -16,7 +22,7 @@ def lint_sql(sql: str, dataset: str, require_time_window: bool = True, time_fiel
       - No CROSS/NATURAL JOIN; warn on JOIN without ON (naive)
     """
     violations: List[Dict] = []
-    s = (sql or "").strip()
+    s = strip_sql_comments(sql).strip()
 
     # SELECT-only
     if not re.search(r'^\s*SELECT\b', s, re.I):
@@ -63,3 +69,20 @@ def lint_sql(sql: str, dataset: str, require_time_window: bool = True, time_fiel
         violations.append({"code":"MULTI_STATEMENT", "severity":"warn", "message":"Multiple statements detected; only one SELECT is allowed."})
 
     return violations
+
+def entity_time_fields(entity: Dict[str, Any]) -> List[str]:
+    """Names of time-like fields on one contract entity (by type or conventional name)."""
+    out: List[str] = []
+    for fname, fmeta in ((entity or {}).get("fields") or {}).items():
+        t = (fmeta.get("type") or "").upper()
+        if t in {"TIMESTAMP","DATETIME","DATE"} or fname.lower() in {"ts","timestamp","event_ts","created_at","time"}:
+            out.append(fname)
+    return out
+
+def contract_time_fields(contract: Dict[str, Any], dataset: str) -> List[str]:
+    """Time-like fields from the contract, in every qualification lint_sql may see."""
+    time_fields: List[str] = []
+    for tbl, ent in ((contract or {}).get("entities") or {}).items():
+        for fname in entity_time_fields(ent):
+            time_fields.extend([f"{dataset}.{tbl}.{fname}", f"{tbl}.{fname}", fname])
+    return time_fields
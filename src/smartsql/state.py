@@ -0,0 +1,104 @@
+from __future__ import annotations
+from pathlib import Path
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Shared state for all API workers: one SQLite database in WAL mode under
+# .smartsql/. Every write is a single IMMEDIATE transaction that also bumps a
+# global version counter, so readers never see torn JSON and each worker's
+# in-memory cache only needs one tiny SELECT to know whether it is stale.
+
+_DATA_DIR = Path(".smartsql")
+_DB_FILE = _DATA_DIR / "state.db"
+
+_local = threading.local()
+_cache: Dict[str, Tuple[int, Any]] = {}
+_cache_lock = threading.Lock()
+_MISSING = object()
+
+def _conn() -> sqlite3.Connection:
+    """Per-thread (and per-process, so forked workers don't share) connection."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+    _DATA_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(str(_DB_FILE), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO meta (k, v) VALUES ('version', 0)")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+def get_version() -> int:
+    """Global version counter; changes whenever any worker writes."""
+    row = _conn().execute("SELECT v FROM meta WHERE k = 'version'").fetchone()
+    return int(row[0]) if row else 0
+
+def _write(conn: sqlite3.Connection, key: str, value: Any) -> None:
+    conn.execute(
+        "INSERT INTO kv (key, value, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+        (key, json.dumps(value), time.time()),
+    )
+    conn.execute("UPDATE meta SET v = v + 1 WHERE k = 'version'")
+
+def _import_legacy(key: str, legacy_file: Optional[Path]) -> Any:
+    """One-time migration from the old per-module JSON files."""
+    if legacy_file is None or not legacy_file.exists():
+        return _MISSING
+    try:
+        value = json.loads(legacy_file.read_text(encoding="utf-8"))
+    except Exception:
+        return _MISSING
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM kv WHERE key = ?", (key,)).fetchone() is None:
+            _write(conn, key, value)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return value
+
+def get_json(key: str, default: Any = None, legacy_file: Optional[Path] = None) -> Any:
+    """Read `key`, served from the in-process cache while the global version is unchanged."""
+    version = get_version()
+    with _cache_lock:
+        hit = _cache.get(key)
+    if hit is not None and hit[0] == version:
+        value = hit[1]
+    else:
+        row = _conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        value = json.loads(row[0]) if row else _import_legacy(key, legacy_file)
+        if value is not _MISSING and legacy_file is not None and row is None:
+            version = get_version()  # the import bumped it
+        with _cache_lock:
+            _cache[key] = (version, value)
+    return copy.deepcopy(default if value is _MISSING else value)
+
+def set_json(key: str, value: Any) -> None:
+    """Atomically replace `key`."""
+    update_json(key, lambda _cur: value)
+
+def update_json(key: str, fn: Callable[[Any], Any], default: Any = None) -> Any:
+    """Atomic read-modify-write of `key` across workers; returns the new value."""
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        cur = json.loads(row[0]) if row else copy.deepcopy(default)
+        new = fn(cur)
+        _write(conn, key, new)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return new
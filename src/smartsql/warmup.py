@@ -0,0 +1,44 @@
+from __future__ import annotations
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Optional warm-up hooks. Heavy SDKs (langgraph, google clients, the generative
+# AI SDK) are imported lazily on first use; call warmup() to pay that cost up
+# front, e.g. from a startup hook or a pre-warm ping, instead of on a user request.
+
+def _graph() -> None:
+    from smartsql.graph import get_graph
+    get_graph()
+
+def _llm() -> None:
+    import google.generativeai  # noqa: F401
+
+def _bigquery() -> None:
+    import google.cloud.bigquery  # noqa: F401
+
+def _state() -> None:
+    from smartsql.registry import get_active_contract
+    get_active_contract()
+
+HOOKS: Dict[str, Callable[[], None]] = {
+    "state": _state,
+    "graph": _graph,
+    "llm": _llm,
+    "bigquery": _bigquery,
+}
+
+def warmup(components: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, object]]:
+    """Run warm-up hooks (all by default); returns per-hook {ok, ms[, error]}."""
+    out: Dict[str, Dict[str, object]] = {}
+    for name in (components or HOOKS.keys()):
+        hook = HOOKS.get(name)
+        if hook is None:
+            out[name] = {"ok": False, "ms": 0, "error": "unknown component"}
+            continue
+        t0 = time.perf_counter()
+        try:
+            hook()
+            out[name] = {"ok": True, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+        except Exception as e:
+            out[name] = {"ok": False, "ms": round((time.perf_counter() - t0) * 1000, 1), "error": str(e)}
+    return out
@@ -29,6 +29,37 @@ async function api(path, opts={}) {
   return {ok: res.ok, data};
 }
 
+// POST and read a Server-Sent Events body; calls onToken per `token` event,
+// resolves with the `result` (or `error`) payload.
+async function streamSSE(path, payload, onToken) {
+  const res = await fetch(path, {
+    method: "POST",
+    headers: {"Content-Type":"application/json"},
+    body: JSON.stringify(payload)
+  });
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "", final = null;
+  for (;;) {
+    const {value, done} = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, {stream: true});
+    let idx;
+    while ((idx = buf.indexOf("\n\n")) >= 0) {
+      const block = buf.slice(0, idx);
+      buf = buf.slice(idx + 2);
+      const event = (block.match(/^event: (.*)$/m) || [])[1];
+      const raw = (block.match(/^data: (.*)$/m) || [])[1];
+      if (!raw) continue;
+      const data = JSON.parse(raw);
+      if (event === "token") onToken(data.text);
+      else if (event === "error") final = {ok: false, ...data};
+      else final = data;
+    }
+  }
+  return final;
+}
+
 async function refreshHealth() {
   const {data} = await api("/health");
   statusEl.textContent = `Provider: ${data.provider} • Offline: ${data.offline ? "yes" : "no"}`;
@@ -75,10 +106,19 @@ async function handleSend() {
   const payload = { text, dataset };
   if (table) payload.table = table;
 
-  const {data} = await api("/chat", {
-    method: "POST",
-    headers: {"Content-Type":"application/json"},
-    body: JSON.stringify(payload)
+  // live SQL preview, filled from `token` events as the draft streams in
+  let live = null;
+  const data = await streamSSE("/chat/stream", payload, (tok) => {
+    if (!live) {
+      addMsg("Draft SQL:");
+      live = document.createElement("pre");
+      const div = document.createElement("div");
+      div.className = "msg bot";
+      div.appendChild(live);
+      chatEl.appendChild(div);
+    }
+    live.textContent += tok;
+    chatEl.scrollTop = chatEl.scrollHeight;
   });
 
   if (!data || data.ok === false) {
@@ -88,8 +128,12 @@ async function handleSend() {
 
   const res = data.result || {};
   if (res.sql) {
-    addMsg("Draft SQL:");
-    addMsg(res.sql);
+    if (live) {
+      live.textContent = res.sql;  // final (rewritten) SQL replaces the raw stream
+    } else {
+      addMsg("Draft SQL:");
+      addMsg(res.sql);
+    }
   }
   if (res.message) addMsg(res.message);
   if (res.violations && res.violations.length) {